@@ -3,6 +3,11 @@ ASGI config for absolut_cinema project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the app through this entry point (e.g. ``uvicorn absolut_cinema.asgi:application``)
+to stream live seat maps from /api/seats/<id>/events/ without tying up a
+worker thread per open browser. Set ASYNC_VIEWS=true as well to serve the
+read-heavy pages from booking/async_views.py on the async MongoDB client.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -59,13 +60,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'booking.logs.RequestIdMiddleware',
+    'booking.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'booking.profiler.MongoProfilerMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'booking.request_profiler.RequestProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'absolut_cinema.urls'
@@ -128,3 +133,146 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Seat holds
+# Seats picked on the reserve page are held for this long while the user pays.
+# Expired holds are released by a reaper thread in each web process every
+# SEAT_HOLD_REAPER_SECONDS. Set it to 0 if `python manage.py release_expired_holds
+# --every N` (or cron) does the job instead.
+SEAT_HOLD_SECONDS = 10 * 60
+SEAT_HOLD_REAPER_SECONDS = int(os.getenv('SEAT_HOLD_REAPER_SECONDS', '30'))
+
+# Live seat maps (/api/seats/<id>/events/). Only turn on when serving through
+# asgi.py (uvicorn absolut_cinema.asgi:application): under WSGI every open
+# stream would hold a worker thread, so the endpoint answers 204 instead.
+LIVE_SEATS = os.getenv('LIVE_SEATS', 'false').lower() == 'true'
+
+# "change_stream" watches MongoDB (needs a replica set, e.g. Atlas; falls back
+# to "local" on a standalone server); "local" publishes from this process's own writes.
+SEAT_EVENTS_SOURCE = os.getenv('SEAT_EVENTS_SOURCE', 'change_stream')
+
+# MongoDB (booking/mongo_db.py): one lazily created client per process, so
+# connections per server stay at workers x maxPoolSize however many modules use it
+MONGO_WRITE_CONCERN = os.getenv('MONGO_WRITE_CONCERN', 'majority')
+
+MONGODB = {
+    'URI': os.getenv('MONGODB_URI') or os.getenv('MONGO_URI'),
+    'NAME': os.getenv('MONGO_DB_NAME', 'absolut_cinema_db'),
+    'SERVER_API': os.getenv('MONGO_SERVER_API'),    # e.g. "1" for Atlas
+    'OPTIONS': {
+        'appname': 'absolut-cinema',
+        'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', 20)),
+        'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', 0)),
+        'maxIdleTimeMS': int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 60_000)),
+        'waitQueueTimeoutMS': int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5_000)),
+        'connectTimeoutMS': int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5_000)),
+        'serverSelectionTimeoutMS': int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5_000)),
+        'socketTimeoutMS': int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 30_000)),
+        'compressors': os.getenv('MONGO_COMPRESSORS', 'zlib'),
+        'retryWrites': os.getenv('MONGO_RETRY_WRITES', 'true').lower() == 'true',
+        'retryReads': os.getenv('MONGO_RETRY_READS', 'true').lower() == 'true',
+        'w': int(MONGO_WRITE_CONCERN) if MONGO_WRITE_CONCERN.isdigit() else MONGO_WRITE_CONCERN,
+        'readConcernLevel': os.getenv('MONGO_READ_CONCERN', 'local'),
+    },
+}
+
+# Read routing (booking/mongo_db.py). Seat maps, reservations and payments always
+# read the primary; these two routes can tolerate slightly stale data.
+# Modes: primary, primaryPreferred, secondary, secondaryPreferred, nearest.
+# max_staleness_seconds must be at least 90 (or -1 for no bound).
+MONGODB_READ_ROUTES = {
+    'catalog': {     # movie/venue/showtime listings
+        'mode': os.getenv('MONGO_CATALOG_READ_PREFERENCE', 'secondaryPreferred'),
+        'max_staleness_seconds': int(os.getenv('MONGO_CATALOG_MAX_STALENESS', 90)),
+    },
+    'analytics': {   # admin dashboard
+        'mode': os.getenv('MONGO_ANALYTICS_READ_PREFERENCE', 'secondaryPreferred'),
+        'max_staleness_seconds': int(os.getenv('MONGO_ANALYTICS_MAX_STALENESS', 300)),
+    },
+}
+
+# Serve movies/reserve/seat availability/confirm from booking/async_views.py.
+# Turn on when running under an ASGI server (uvicorn absolut_cinema.asgi:application).
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'false').lower() == 'true'
+
+# Cache (booking/caching.py). CACHE_BACKEND picks where it lives:
+#   locmem     - in each process (default)
+#   file       - on local disk, shared by every worker on the host
+#   redis      - shared across hosts (needs the redis package)
+#   memcached  - shared across hosts (needs pymemcache)
+# CACHE_LOCATION overrides the path / server URL.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'absolut-cinema'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', '/var/tmp/absolut_cinema_cache'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+}
+CACHE_BACKEND, CACHE_DEFAULT_LOCATION = CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'locmem')]
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', CACHE_DEFAULT_LOCATION),
+        'TIMEOUT': 300,
+        'KEY_PREFIX': 'absolut_cinema',
+        'OPTIONS': {'MAX_ENTRIES': 10_000} if 'locmem' in CACHE_BACKEND or 'filebased' in CACHE_BACKEND else {},
+    },
+}
+
+# Sessions: cached_db reads a session from the cache and only falls back to
+# SQLite on a miss; signed_cookies keeps it in the browser (no lookup at all).
+# cached_db needs a cache every worker shares (file, redis, memcached): with
+# locmem each worker would keep serving its own stale copy of a session, so the
+# default there is signed_cookies. Its data (user id, ticket refs, Mongo causal
+# times) stays small; it is signed with SECRET_KEY, not encrypted.
+SHARED_CACHE = os.getenv('CACHE_BACKEND', 'locmem') != 'locmem'
+
+SESSION_ENGINE = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}[os.getenv('SESSION_BACKEND', 'cached_db' if SHARED_CACHE else 'signed_cookies')]
+
+# Per-request MongoDB command profiling (booking/profiler.py): debug headers
+# when DEBUG is on, rolling summary at /admin-dashboard/mongo-profile/
+MONGO_PROFILER = os.getenv('MONGO_PROFILER', 'true').lower() == 'true'
+
+# Prometheus metrics at /metrics (booking/metrics.py). Set a token to require
+# `Authorization: Bearer <token>` on scrapes.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Logging (booking/logs.py): JSON lines on stderr, written by a background
+# thread off a bounded queue, each tagged with the request's X-Request-ID.
+# LOG_LEVEL=DEBUG turns on the booking flow's debug records;
+# LOG_DEBUG_SAMPLE_RATE keeps only that share of requests' debug records.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'booking.logs.RequestIdFilter'},
+        'sampling': {
+            '()': 'booking.logs.SamplingFilter',
+            'rate': float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 1.0)),
+        },
+    },
+    'handlers': {
+        'queue': {
+            '()': 'booking.logs.QueueJsonHandler',
+            'filters': ['request_id', 'sampling'],
+        },
+    },
+    'root': {'handlers': ['queue'], 'level': 'WARNING'},
+    'loggers': {
+        'booking': {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False},
+        'django': {'handlers': ['queue'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# cProfile of live requests (booking/request_profiler.py). Staff can always ask
+# for one (X-Profile: 1 or ?_profile=1); PROFILER_SAMPLE_RATE also profiles
+# that share of all requests. Browse them at /admin-dashboard/profiles/.
+PROFILER_SAMPLE_RATE = float(os.getenv('PROFILER_SAMPLE_RATE', 0))
+PROFILER_DIR = os.getenv('PROFILER_DIR', BASE_DIR / 'profiles')
+PROFILER_KEEP = int(os.getenv('PROFILER_KEEP', 20))    # newest profiles kept per endpoint
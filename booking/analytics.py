@@ -0,0 +1,263 @@
+"""
+Sales rollups for the admin dashboard.
+
+Instead of aggregating the whole bookings collection on every dashboard load,
+payment_view bumps three small rollup collections with $inc as each booking is
+paid:
+
+- rollup_movies: {_id: movie_id, title, total_revenue, tickets_sold}
+- rollup_venues: {_id: venue_id, name, city, total_revenue, total_tickets}
+- rollup_daily:  {_id: "YYYY-MM-DD" (UTC day of payment.paid_at), daily_sales, tickets_sold}
+
+The dashboard reads those documents, so it stays just as fast however many
+bookings there are. `python manage.py rebuild_rollups` recomputes them from
+the confirmed bookings (e.g. after a crash between a payment and its rollup update).
+
+Requests with a date range (`from` / `to` / `granularity` / `tz`) can't be
+answered from the all-time rollups, so ranged_dashboard_data aggregates just
+the bookings paid inside the window instead.
+
+Dashboard reads go through analytics_db, which reads from secondaries when
+there are any (settings.MONGODB_READ_ROUTES), so they never queue behind seat
+reservations on the primary. Writes and the $out rebuilds stay on the primary.
+"""
+
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .mongo_db import analytics_db, db
+
+
+def record_payment(booking, movie, venue, paid_at):
+    """Add one confirmed booking to the rollups. `paid_at` is UTC (aware, or naive UTC)."""
+    revenue = booking["total_price"]
+    tickets = len(booking["seats"])
+
+    db.rollup_movies.update_one(
+        {"_id": booking["movie_id"]},
+        {
+            "$inc": {"total_revenue": revenue, "tickets_sold": tickets},
+            "$set": {"title": movie["title"] if movie else None},
+        },
+        upsert=True,
+    )
+    db.rollup_venues.update_one(
+        {"_id": booking["venue_id"]},
+        {
+            "$inc": {"total_revenue": revenue, "total_tickets": tickets},
+            "$set": {"name": venue["name"] if venue else None, "city": venue.get("city") if venue else None},
+        },
+        upsert=True,
+    )
+    # Same UTC day as the $dateToString in REBUILD_PIPELINES, so a rebuild keeps every key
+    if paid_at.tzinfo is not None:
+        paid_at = paid_at.astimezone(timezone.utc)
+    db.rollup_daily.update_one(
+        {"_id": paid_at.strftime("%Y-%m-%d")},
+        {"$inc": {"daily_sales": revenue, "tickets_sold": tickets}},
+        upsert=True,
+    )
+
+
+def dashboard_data():
+    """Everything analytics_data returns, in the shape the dashboard charts expect."""
+    movie_revenue = [
+        {"_id": m["title"], "total_revenue": m["total_revenue"], "tickets_sold": m["tickets_sold"]}
+        for m in analytics_db.rollup_movies.find({"title": {"$ne": None}})
+    ]
+    venue_revenue = [
+        {"_id": v["name"], "total_revenue": v["total_revenue"], "total_tickets": v["total_tickets"], "city": v["city"]}
+        for v in analytics_db.rollup_venues.find({"name": {"$ne": None}})
+    ]
+    daily_sales = list(analytics_db.rollup_daily.find().sort("_id", 1))
+
+    return {
+        "movieRevenue": movie_revenue,
+        "venueRevenue": venue_revenue,
+        "dailySales": daily_sales,
+    }
+
+
+# Pipelines that recompute each rollup from scratch; $out swaps the result in atomically
+CONFIRMED = {"$match": {"booking_confirmed": True}}
+
+REBUILD_PIPELINES = {
+    "rollup_movies": [
+        CONFIRMED,
+        {"$group": {
+            "_id": "$movie_id",
+            "total_revenue": {"$sum": "$total_price"},
+            "tickets_sold": {"$sum": {"$size": "$seats"}}
+        }},
+        {"$lookup": {"from": "movies", "localField": "_id", "foreignField": "_id", "as": "movie"}},
+        {"$set": {"title": {"$first": "$movie.title"}}},
+        {"$unset": "movie"},
+        {"$out": "rollup_movies"},
+    ],
+    "rollup_venues": [
+        CONFIRMED,
+        {"$group": {
+            "_id": "$venue_id",
+            "total_revenue": {"$sum": "$total_price"},
+            "total_tickets": {"$sum": {"$size": "$seats"}}
+        }},
+        {"$lookup": {"from": "venues", "localField": "_id", "foreignField": "_id", "as": "venue"}},
+        {"$set": {"name": {"$first": "$venue.name"}, "city": {"$first": "$venue.city"}}},
+        {"$unset": "venue"},
+        {"$out": "rollup_venues"},
+    ],
+    "rollup_daily": [
+        CONFIRMED,
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$payment.paid_at"}},
+            "daily_sales": {"$sum": "$total_price"},
+            "tickets_sold": {"$sum": {"$size": "$seats"}}
+        }},
+        {"$out": "rollup_daily"},
+    ],
+}
+
+
+def rebuild_rollups():
+    """Recompute every rollup collection from the confirmed bookings. Returns {collection: document count}."""
+    counts = {}
+    for collection, pipeline in REBUILD_PIPELINES.items():
+        db.bookings.aggregate(pipeline)
+        counts[collection] = db[collection].estimated_document_count()
+    return counts
+
+
+# ------------------------
+# DATE-RANGED ANALYTICS
+# ------------------------
+
+# Bucket label for each granularity (weeks start on Monday and are labelled by that day)
+GRANULARITY_FORMATS = {
+    "hour": "%Y-%m-%d %H:00",
+    "day": "%Y-%m-%d",
+    "week": "%Y-%m-%d",
+    "month": "%Y-%m",
+}
+
+
+RANGE_PARAMS = ("from", "to", "granularity", "tz")
+DEFAULT_RANGE = timedelta(days=7)
+
+# Longest window per granularity, so one request can't ask for years of hourly buckets
+MAX_SPANS = {
+    "hour": timedelta(days=31),
+    "day": timedelta(days=366),
+    "week": timedelta(days=3 * 366),
+    "month": timedelta(days=10 * 366),
+}
+
+
+def parse_range(params, now=None):
+    """
+    Read `from` / `to` / `granularity` / `tz` query parameters.
+
+    Dates are ISO 8601 in `tz` (default UTC). A bare `to` date includes that
+    whole day. `to` defaults to now and `from` to 7 days before `to`; the
+    window may be at most MAX_SPANS[granularity] long.
+    Returns (start, end, granularity, tz) with start/end as naive UTC datetimes,
+    which is how pymongo hands back the UTC dates MongoDB stores. Raises
+    ValueError on bad input.
+    """
+    tz = params.get("tz") or "UTC"
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown time zone: {tz}")
+
+    granularity = params.get("granularity") or "day"
+    if granularity not in GRANULARITY_FORMATS:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITY_FORMATS)}")
+
+    def to_utc(value, name):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"{name} must be an ISO date or datetime")
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=zone)
+        return parsed.astimezone(timezone.utc).replace(tzinfo=None), len(value) == 10
+
+    if params.get("to"):
+        end, date_only = to_utc(params["to"], "to")
+        if date_only:
+            end += timedelta(days=1)
+    else:
+        end = now or datetime.now(timezone.utc).replace(tzinfo=None)
+
+    start = to_utc(params["from"], "from")[0] if params.get("from") else end - DEFAULT_RANGE
+    if start >= end:
+        raise ValueError("from must be before to")
+    if end - start > MAX_SPANS[granularity]:
+        raise ValueError(f"{granularity.capitalize()} ranges can span at most {MAX_SPANS[granularity].days} days")
+
+    return start, end, granularity, tz
+
+
+def ranged_dashboard_data(start, end, granularity="day", tz="UTC"):
+    """
+    Dashboard data for bookings paid in [start, end), bucketed by `granularity` in time zone `tz`.
+
+    `start` / `end` are naive UTC datetimes. Every pipeline opens with the same
+    $match on payment.paid_at, which the `paid_at` index serves, so a 7-day
+    window only ever touches 7 days of bookings.
+    """
+    match = {"$match": {
+        "payment.paid_at": {"$gte": start, "$lt": end},
+        "booking_confirmed": True,
+    }}
+
+    movie_revenue = list(analytics_db.bookings.aggregate([
+        match,
+        {"$group": {
+            "_id": "$movie_id",
+            "total_revenue": {"$sum": "$total_price"},
+            "tickets_sold": {"$sum": {"$size": "$seats"}}
+        }},
+        {"$lookup": {"from": "movies", "localField": "_id", "foreignField": "_id", "as": "movie"}},
+        {"$unwind": "$movie"},
+        {"$project": {"_id": "$movie.title", "total_revenue": 1, "tickets_sold": 1}},
+    ]))
+
+    venue_revenue = list(analytics_db.bookings.aggregate([
+        match,
+        {"$group": {
+            "_id": "$venue_id",
+            "total_revenue": {"$sum": "$total_price"},
+            "total_tickets": {"$sum": {"$size": "$seats"}}
+        }},
+        {"$lookup": {"from": "venues", "localField": "_id", "foreignField": "_id", "as": "venue"}},
+        {"$unwind": "$venue"},
+        {"$project": {"_id": "$venue.name", "total_revenue": 1, "total_tickets": 1, "city": "$venue.city"}},
+    ]))
+
+    # Key kept as dailySales so the dashboard reads every granularity the same way
+    daily_sales = list(analytics_db.bookings.aggregate([
+        match,
+        {"$group": {
+            "_id": {"$dateTrunc": {
+                "date": "$payment.paid_at",
+                "unit": granularity,
+                "timezone": tz,
+                "startOfWeek": "monday",
+            }},
+            "daily_sales": {"$sum": "$total_price"},
+            "tickets_sold": {"$sum": {"$size": "$seats"}}
+        }},
+        {"$sort": {"_id": 1}},
+        {"$set": {"_id": {"$dateToString": {
+            "format": GRANULARITY_FORMATS[granularity],
+            "date": "$_id",
+            "timezone": tz,
+        }}}},
+    ]))
+
+    return {
+        "movieRevenue": movie_revenue,
+        "venueRevenue": venue_revenue,
+        "dailySales": daily_sales,
+    }
@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
 
 
 class BookingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'booking'
+
+    def ready(self):
+        # Release expired seat holds from the web process itself. Started on the
+        # first request, so migrate, shell and the other commands don't get a reaper.
+        if getattr(settings, "SEAT_HOLD_REAPER_SECONDS", 0) > 0:
+            request_started.connect(start_reaper, dispatch_uid="booking.start_hold_reaper")
+
+
+def start_reaper(**kwargs):
+    from .seats import start_hold_reaper
+    start_hold_reaper(settings.SEAT_HOLD_REAPER_SECONDS)
@@ -0,0 +1,139 @@
+"""
+Async versions of the read-heavy views, for serving through asgi.py.
+
+Same URLs, templates and responses as their counterparts in views.py, but
+every MongoDB call is awaited on pymongo's async client (mongo_db.get_async_db)
+and independent lookups, like a showtime's movie and venue (cached, see
+caching.py), run concurrently with asyncio.gather. A worker process then waits on thousands of in-flight
+requests instead of parking one thread per request.
+
+urls.py switches to these when settings.ASYNC_VIEWS is on. Only turn it on
+under an ASGI server: under WSGI Django runs every async view on a fresh
+event loop, which would mean a fresh async client per request.
+"""
+
+import asyncio
+
+from bson import ObjectId
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import redirect, render
+from django.utils.cache import get_conditional_response, quote_etag
+from django.views.decorators.cache import cache_control
+
+from .caching import acached, aget_movie, aget_venue, cache_key
+from .mongo_db import get_async_db
+from .views import MOVIES_TIMEOUT, confirm_context, movies_context, reserve_context, seat_availability, showtime_venue_ids
+
+
+async def _load_user(request):
+    # Resolve the user without blocking and pin it on the request, so templates
+    # reading request.user don't trigger a synchronous auth query
+    request.user = await request.auser()
+    return request.user
+
+
+# ------------------------
+# MOVIES PAGE
+# ------------------------
+
+@login_required
+async def movies_view(request):
+    await _load_user(request)
+    catalog = get_async_db("catalog")
+
+    async def showtimes_and_venues():
+        showtimes = await catalog.showtimes.find({}, {"seats": 0}).to_list()
+        venues = await catalog.venues.find({"_id": {"$in": showtime_venue_ids(showtimes)}}).to_list()
+        return showtimes, venues
+
+    movies, (showtimes, venues) = await asyncio.gather(
+        acached(cache_key("movies"), lambda: catalog.movies.find().to_list(), timeout=MOVIES_TIMEOUT),
+        showtimes_and_venues(),
+    )
+    return render(request, "booking/movies.html", movies_context(movies, showtimes, venues))
+
+
+# ------------------------
+# RESERVE PAGE
+# ------------------------
+
+@login_required
+async def reserve_view(request, showtime_id):
+    await _load_user(request)
+    try:
+        showtime_oid = ObjectId(showtime_id)
+    except Exception:
+        return redirect("movies")
+
+    showtime = await get_async_db().showtimes.find_one({"_id": showtime_oid}, {"seats": 0})
+    if not showtime:
+        return redirect("movies")
+
+    movie, venue = await asyncio.gather(aget_movie(showtime["movie_id"]), aget_venue(showtime["venue_id"]))
+    return render(request, "booking/reserve.html", reserve_context(showtime_id, showtime, movie, venue))
+
+
+# ------------------------
+# APIs
+# ------------------------
+
+# Same ETag as views.seat_availability_api. condition() would call its etag
+# function synchronously, so the revalidation is done here instead.
+@cache_control(no_cache=True)
+async def seat_availability_api(request, showtime_id):
+    try:
+        showtime_oid = ObjectId(showtime_id)
+    except Exception:
+        return JsonResponse({"error": "Invalid showtime ID"}, status=400)
+
+    showtimes = get_async_db().showtimes
+    current = await showtimes.find_one({"_id": showtime_oid}, {"seat_version": 1})
+    if not current:
+        return JsonResponse({"error": "Showtime not found"}, status=404)
+
+    etag = quote_etag(f'{showtime_id}-{current.get("seat_version", 0)}-full')
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    # Tag the body with the version it was read at, in case a reservation landed in between
+    showtime = await showtimes.find_one({"_id": showtime_oid}, {"seats.seat": 1, "seats.status": 1, "seat_version": 1})
+    if not showtime:
+        return JsonResponse({"error": "Showtime not found"}, status=404)
+    response = JsonResponse(seat_availability(showtime), safe=False)
+    response["ETag"] = quote_etag(f'{showtime_id}-{showtime.get("seat_version", 0)}-full')
+    return response
+
+
+# ------------------------
+# CONFIRM PAGE
+# ------------------------
+
+@login_required
+async def confirm_view(request):
+    user = await _load_user(request)
+    ticket_ref = await request.session.aget("last_ticket_ref")
+    showtime_id = await request.session.aget("last_showtime_id")
+    booking_id = await request.session.aget("last_booking_id")
+
+    # If someone manually goes to /confirm with no session data
+    if not ticket_ref or not showtime_id or not booking_id:
+        return redirect("movies")
+
+    try:
+        database = get_async_db()
+        booking, showtime = await asyncio.gather(
+            database.bookings.find_one({"_id": ObjectId(booking_id)}),
+            database.showtimes.find_one({"_id": ObjectId(showtime_id)}),
+        )
+        if not booking or booking["user_id"] != user.id or not showtime:
+            return redirect("movies")
+
+        movie, venue = await asyncio.gather(aget_movie(showtime["movie_id"]), aget_venue(showtime["venue_id"]))
+        if not movie or not venue:
+            return redirect("movies")
+
+        return render(request, "booking/confirm.html", confirm_context(ticket_ref, showtime, booking, movie, venue))
+    except Exception:
+        return redirect("movies")
@@ -0,0 +1,168 @@
+"""
+Latency benchmark of the booking views.
+
+Drives every view a customer (and the admin dashboard) hits through Django's
+test client, against whatever database MONGO_DB_NAME points at:
+
+    movies_view -> reserve_view -> seat_availability_api -> reserve_seat_api
+    -> payment_view (GET, then POST) -> confirm_view, plus analytics_data
+
+Each request is timed and its MongoDB round trips are counted with the
+command_counter listener from mongo_db.py. Results per endpoint:
+
+    {"requests", "errors", "p50_ms", "p95_ms", "p99_ms", "mean_ms",
+     "throughput_rps", "mongo_round_trips"}
+
+throughput_rps is for one client issuing requests back to back, so it is the
+inverse of mean latency, not a concurrency figure.
+It logs in as a staff user ("benchmark"), so analytics_data is reachable.
+The purchase flow really buys seats, so run it against a throwaway database.
+"""
+
+import statistics
+import time
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.test import Client
+
+from .mongo_db import command_counter, db
+
+BENCHMARK_USERNAME = "benchmark"
+
+ANALYTICS_URL = "/dashboard/analytics-data/"
+ANALYTICS_KEYS = ("movieRevenue", "venueRevenue", "dailySales")
+
+# Dataset presets for `benchmark_endpoints --sizes` (booking/datagen.py knobs)
+SIZES = {
+    "small": {"venues": 3, "screens": 4, "seats_per_screen": 150, "days": 7, "users": 1_000},
+    "medium": {"venues": 20, "screens": 8, "seats_per_screen": 300, "days": 30, "users": 50_000},
+    "large": {"venues": 100, "screens": 10, "seats_per_screen": 300, "days": 60, "users": 500_000},
+}
+
+
+def summarize(samples):
+    """[(seconds, round_trips, ok)] -> the per-endpoint result dict."""
+    latencies = sorted(seconds for seconds, _, _ in samples)
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0]
+    total = sum(latencies)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, _, ok in samples if not ok),
+        "p50_ms": round(p50 * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+        "p99_ms": round(p99 * 1000, 2),
+        "mean_ms": round(total / len(samples) * 1000, 2),
+        "throughput_rps": round(len(samples) / total, 1) if total else None,
+        "mongo_round_trips": round(statistics.mean(trips for _, trips, _ in samples), 2),
+    }
+
+
+class EndpointBenchmark:
+    """Runs the purchase flow `iterations` times and collects samples per endpoint."""
+
+    def __init__(self, iterations=100, warmup=5):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.samples = defaultdict(list)
+        self.recording = False
+        # localhost is in DEBUG's implicit ALLOWED_HOSTS, "testserver" isn't outside the test runner
+        self.client = Client(raise_request_exception=False, HTTP_HOST="localhost")
+        # Staff, so the admin dashboard's analytics_data answers instead of a 403
+        user, _ = User.objects.update_or_create(username=BENCHMARK_USERNAME, defaults={"is_staff": True})
+        self.client.force_login(user)
+
+    def request(self, name, method, path, expect=(200,), expect_location=None, expect_keys=(), **kwargs):
+        before = command_counter.count
+        started = time.perf_counter()
+        response = getattr(self.client, method)(path, **kwargs)
+        elapsed = time.perf_counter() - started
+
+        ok = response.status_code in expect
+        if ok and expect_location:
+            ok = response.get("Location", "").startswith(expect_location)
+        if ok and expect_keys:
+            ok = all(key in response.json() for key in expect_keys)
+        if self.recording:
+            self.samples[name].append((elapsed, command_counter.count - before, ok))
+        return response
+
+    def pick_seats(self, count):
+        """(showtime_id, seat) pairs still on sale, spread over random showtimes."""
+        picks = []
+        pipeline = [
+            {"$match": {"seats.status": "available"}},
+            {"$sample": {"size": count}},
+            {"$project": {"seats": {"$filter": {
+                "input": "$seats", "cond": {"$eq": ["$$this.status", "available"]},
+            }}}},
+        ]
+        for showtime in db.showtimes.aggregate(pipeline):
+            picks.append((str(showtime["_id"]), showtime["seats"][0]["seat"]))
+        if not picks:
+            raise RuntimeError("No showtime has a free seat; generate data first")
+        while len(picks) < count:
+            picks.extend(picks[:count - len(picks)])
+        return picks
+
+    def purchase(self, showtime_id, seat):
+        self.request("movies_view", "get", "/movies/")
+        self.request("reserve_view", "get", f"/reserve/{showtime_id}/")
+        self.request("seat_availability_api", "get", f"/api/seats/{showtime_id}/")
+
+        response = self.request(
+            "reserve_seat_api", "post", "/api/reserve/",
+            data={"showtime_id": showtime_id, "seat_ids": [seat]}, content_type="application/json",
+        )
+        if response.status_code != 200:
+            return  # seat got taken (picks can repeat on small data sets); skip the rest of the flow
+        booking_id = response.json()["booking_id"]
+
+        payment_url = f"/payment/?showtime_id={showtime_id}&booking_id={booking_id}"
+        self.request("payment_view", "get", payment_url)
+        self.request(
+            "payment_view_submit", "post", payment_url,
+            data={"payment_method": "card", "account_number": "4111111111111111"},
+            expect=(302,), expect_location="/confirm/",
+        )
+        self.request("confirm_view", "get", "/confirm/")
+
+    def check_analytics(self):
+        """Fail fast if the dashboard data can't be read, rather than timing error pages."""
+        response = self.client.get(ANALYTICS_URL)
+        if response.status_code != 200 or not all(key in response.json() for key in ANALYTICS_KEYS):
+            raise RuntimeError(f"{ANALYTICS_URL} answered {response.status_code} for the benchmark user, not dashboard data")
+
+    def run(self):
+        """Returns {endpoint: result dict}."""
+        self.check_analytics()
+        picks = self.pick_seats(self.warmup + self.iterations)
+        for i, (showtime_id, seat) in enumerate(picks):
+            self.recording = i >= self.warmup
+            self.purchase(showtime_id, seat)
+            self.request("analytics_data", "get", ANALYTICS_URL, expect_keys=ANALYTICS_KEYS)
+            self.request("analytics_data_7d", "get", ANALYTICS_URL + "?granularity=day", expect_keys=ANALYTICS_KEYS)
+        return {name: summarize(samples) for name, samples in sorted(self.samples.items())}
+
+
+def compare(baseline, current):
+    """Lines describing p95 changes between two reports, size by size."""
+    lines = []
+    for size, result in current["sizes"].items():
+        before = baseline.get("sizes", {}).get(size)
+        if not before:
+            continue
+        for endpoint, stats in result["endpoints"].items():
+            old = before["endpoints"].get(endpoint)
+            if not old or not old["p95_ms"]:
+                continue
+            change = (stats["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100
+            lines.append(
+                f"{size:>6} {endpoint:<24} p95 {old['p95_ms']:>8.2f} -> {stats['p95_ms']:>8.2f} ms ({change:+.0f}%)"
+                f"  round trips {old['mongo_round_trips']} -> {stats['mongo_round_trips']}"
+            )
+    return lines
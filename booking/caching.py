@@ -0,0 +1,77 @@
+"""
+Small helpers on top of Django's cache framework (settings.CACHES).
+
+    from .caching import cache_key, cached
+
+    movies = cached(cache_key("movies"), lambda: list(catalog_db.movies.find()), timeout=60)
+
+Cached values are whatever compute() returned (pickled, so ObjectIds and
+datetimes are fine). None is never cached, so a lookup that found nothing is
+retried next time. Keep cached data to things that may be a few minutes stale:
+catalog documents, not seat maps.
+
+get_movie / get_venue (and their async twins) are the catalog lookups every
+booking page makes, cached for CATALOG_TIMEOUT.
+"""
+
+from django.core.cache import caches
+
+from .mongo_db import catalog_db, get_async_db
+
+CATALOG_TIMEOUT = 5 * 60
+
+
+def cache_key(*parts):
+    """'booking:movie:654321...' style key from any parts."""
+    return ":".join(["booking", *map(str, parts)])
+
+
+def cached(key, compute, timeout=CATALOG_TIMEOUT, alias="default"):
+    """The value cached under `key`, computed with compute() and stored on a miss."""
+    cache = caches[alias]
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        if value is not None:
+            cache.set(key, value, timeout)
+    return value
+
+
+async def acached(key, compute, timeout=CATALOG_TIMEOUT, alias="default"):
+    """Async cached(): compute is a coroutine function."""
+    cache = caches[alias]
+    value = await cache.aget(key)
+    if value is None:
+        value = await compute()
+        if value is not None:
+            await cache.aset(key, value, timeout)
+    return value
+
+
+def invalidate(*keys, alias="default"):
+    """Drop cached values, e.g. right after editing the documents behind them."""
+    caches[alias].delete_many(keys)
+
+
+# ------------------------
+# CATALOG LOOKUPS
+# ------------------------
+
+def get_movie(movie_id):
+    return cached(cache_key("movie", movie_id), lambda: catalog_db.movies.find_one({"_id": movie_id}))
+
+
+def get_venue(venue_id):
+    return cached(cache_key("venue", venue_id), lambda: catalog_db.venues.find_one({"_id": venue_id}))
+
+
+async def aget_movie(movie_id):
+    return await acached(
+        cache_key("movie", movie_id), lambda: get_async_db("catalog").movies.find_one({"_id": movie_id})
+    )
+
+
+async def aget_venue(venue_id):
+    return await acached(
+        cache_key("venue", venue_id), lambda: get_async_db("catalog").venues.find_one({"_id": venue_id})
+    )
@@ -0,0 +1,355 @@
+"""
+Consistency checks between showtime seat maps and bookings.
+
+These are the checks validate.py used to run, rewritten so they scale:
+nothing is loaded into memory whole, and no query is issued per booking.
+
+- Showtimes are streamed in _id order and checked in chunks. Each chunk costs
+  one query for its bookings (`showtime_id $in`, served by the `showtime` index),
+  hashed by showtime_id. Chunks run in parallel on a thread pool.
+- User references are checked from one server-side $group of distinct
+  user_ids, looked up in batches.
+
+Problems found (each a plain dict, so reports serialise straight to JSON):
+
+    sold_without_booking   seat is sold but no booking has it
+    held_without_booking   seat is held but no booking has it
+    booked_not_sold        confirmed booking has a seat that isn't sold
+    pending_not_held       pending booking has a seat that isn't held
+    double_booked          seat appears in more than one booking
+    missing_showtime       booking points at a showtime that doesn't exist
+    missing_user           booking points at a user that doesn't exist
+
+Incremental mode re-checks only what changed since the previous run. Every seat
+or booking write sets `updated_at`, and the run start (minus a small overlap for
+writes still in flight) is kept as a watermark in `consistency_watermarks`.
+Seat-releasing paths touch the showtime, so deleted bookings are covered too.
+The one exception is the TTL backstop on abandoned bookings, which only a full
+run sees.
+
+Repair mode turns problems into seat updates: orphaned sold/held seats go back
+on sale, seats of confirmed bookings that are still available get marked sold.
+plan_repairs shows the diff; apply_repairs sends it as unordered bulk_writes.
+Every update is guarded on the seats still being in the state the check saw,
+and on the showtime not having been written in the last REPAIR_GRACE. That
+keeps in-flight reservations and payments from being "repaired".
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from django.contrib.auth.models import User
+
+from .mongo_db import db
+from .seats import track_seat_change
+
+SEAT_FIELDS = {"seats.seat": 1, "seats.status": 1}
+BOOKING_FIELDS = {"showtime_id": 1, "seats": 1, "booking_confirmed": 1}
+
+
+def check_showtime(showtime, bookings):
+    """Compare one showtime's seat map with its bookings. Returns a list of problems."""
+    showtime_id = str(showtime["_id"])
+    sold = {s["seat"] for s in showtime.get("seats", []) if s["status"] == "sold"}
+    held = {s["seat"] for s in showtime.get("seats", []) if s["status"] == "held"}
+    status_by_seat = {s["seat"]: s["status"] for s in showtime.get("seats", [])}
+
+    confirmed, pending = set(), set()
+    confirmed_by = {}
+    seat_counts = Counter()
+    for booking in bookings:
+        if booking.get("booking_confirmed"):
+            confirmed.update(booking["seats"])
+            confirmed_by.update({seat: str(booking["_id"]) for seat in booking["seats"]})
+        else:
+            pending.update(booking["seats"])
+        seat_counts.update(booking["seats"])
+
+    problems = []
+
+    def report(check, seats, **details):
+        if seats:
+            problems.append({"check": check, "showtime_id": showtime_id, "seats": sorted(seats), **details})
+
+    report("sold_without_booking", sold - confirmed - pending)
+    report("held_without_booking", held - pending - confirmed)
+    not_sold = confirmed - sold
+    report(
+        "booked_not_sold", not_sold,
+        seat_status={seat: status_by_seat.get(seat) for seat in sorted(not_sold)},
+        booking_ids={seat: confirmed_by[seat] for seat in sorted(not_sold)},
+    )
+    report("pending_not_held", pending - held)
+    report("double_booked", {seat for seat, count in seat_counts.items() if count > 1})
+    return problems
+
+
+def _check_chunk(showtimes, legacy_bookings):
+    ids = [st["_id"] for st in showtimes]
+    bookings_by_showtime = {}
+    for booking in db.bookings.find({"showtime_id": {"$in": ids}}, BOOKING_FIELDS):
+        bookings_by_showtime.setdefault(booking["showtime_id"], []).append(booking)
+
+    problems = []
+    for showtime in showtimes:
+        bookings = bookings_by_showtime.get(showtime["_id"], []) + legacy_bookings.get(showtime["_id"], [])
+        problems.extend(check_showtime(showtime, bookings))
+    return problems
+
+
+def _legacy_bookings(movie_ids=None):
+    """
+    Bookings from the original seed data have no showtime_id, only movie/venue
+    and a copy of the schedule. Resolve them to showtimes once, up front
+    (only those for `movie_ids` when given). The `showtime` index finds them
+    through its null entries; there are few, so movie_id is filtered after the fetch.
+    Returns ({showtime_id: [booking]}, problems).
+    """
+    query = {"showtime_id": {"$exists": False}}
+    if movie_ids is not None:
+        query["movie_id"] = {"$in": list(movie_ids)}
+    legacy = list(db.bookings.find(
+        query,
+        {**BOOKING_FIELDS, "movie_id": 1, "venue_id": 1, "showtimes.schedule": 1},
+    ))
+    if not legacy:
+        return {}, []
+
+    keys = {(b["movie_id"], b["venue_id"], b.get("showtimes", {}).get("schedule")) for b in legacy}
+    showtime_by_key = {
+        (st["movie_id"], st["venue_id"], st["schedule"]): st["_id"]
+        for st in db.showtimes.find(
+            {"$or": [{"movie_id": m, "venue_id": v, "schedule": s} for m, v, s in keys]},
+            {"movie_id": 1, "venue_id": 1, "schedule": 1},
+        )
+    }
+
+    resolved, problems = {}, []
+    for booking in legacy:
+        key = (booking["movie_id"], booking["venue_id"], booking.get("showtimes", {}).get("schedule"))
+        if key in showtime_by_key:
+            resolved.setdefault(showtime_by_key[key], []).append(booking)
+        else:
+            problems.append({"check": "missing_showtime", "booking_id": str(booking["_id"])})
+    return resolved, problems
+
+
+def check_showtimes(query=None, chunk_size=500, workers=4, legacy_movie_ids=None):
+    """Check the seat maps of every showtime matching `query` against their bookings."""
+    legacy, problems = _legacy_bookings(legacy_movie_ids)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        chunk = []
+        for showtime in db.showtimes.find(query or {}, SEAT_FIELDS).sort("_id", 1):
+            chunk.append(showtime)
+            if len(chunk) >= chunk_size:
+                futures.append(pool.submit(_check_chunk, chunk, legacy))
+                chunk = []
+                # Don't let the cursor race ahead of the workers and fill memory
+                if len(futures) >= workers * 2:
+                    problems.extend(futures.pop(0).result())
+        if chunk:
+            futures.append(pool.submit(_check_chunk, chunk, legacy))
+        for future in futures:
+            problems.extend(future.result())
+
+    return problems
+
+
+def check_booking_references(query=None, batch_size=1000):
+    """Bookings pointing at showtimes or users that don't exist."""
+    problems = []
+
+    # Showtimes: distinct showtime_ids, looked up in batches
+    showtime_ids = db.bookings.distinct("showtime_id", query or {})
+    for start in range(0, len(showtime_ids), batch_size):
+        batch = showtime_ids[start:start + batch_size]
+        found = {st["_id"] for st in db.showtimes.find({"_id": {"$in": batch}}, {"_id": 1})}
+        missing = [sid for sid in batch if sid not in found]
+        for booking in db.bookings.find({**(query or {}), "showtime_id": {"$in": missing}}, {"_id": 1}):
+            problems.append({"check": "missing_showtime", "booking_id": str(booking["_id"])})
+
+    # Users: seed bookings point at the Mongo users collection (ObjectIds),
+    # bookings made in the app at Django auth users (ints)
+    user_ids = [row["_id"] for row in db.bookings.aggregate([
+        {"$match": query or {}},
+        {"$group": {"_id": "$user_id"}},
+    ])]
+    missing_users = []
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        mongo_ids = [uid for uid in batch if isinstance(uid, ObjectId)]
+        django_ids = [uid for uid in batch if isinstance(uid, int)]
+        found = {u["_id"] for u in db.users.find({"_id": {"$in": mongo_ids}}, {"_id": 1})}
+        found.update(User.objects.filter(id__in=django_ids).values_list("id", flat=True))
+        missing_users.extend(uid for uid in batch if uid not in found)
+
+    if missing_users:
+        for booking in db.bookings.find({**(query or {}), "user_id": {"$in": missing_users}}, {"user_id": 1}):
+            problems.append({
+                "check": "missing_user",
+                "booking_id": str(booking["_id"]),
+                "user_id": str(booking.get("user_id")),
+            })
+    return problems
+
+
+def full_report(chunk_size=500, workers=4):
+    """Run every check over the whole database. Returns a JSON-serialisable report."""
+    started = datetime.now()
+    problems = check_showtimes(chunk_size=chunk_size, workers=workers) + check_booking_references()
+    return build_report(problems, started, mode="full")
+
+
+# ------------------------
+# INCREMENTAL MODE
+# ------------------------
+
+WATERMARK_ID = "check_consistency"
+
+# Writes that started before a run but commit after it must still be seen next time
+WATERMARK_OVERLAP = timedelta(seconds=60)
+
+
+def load_watermark():
+    doc = db.consistency_watermarks.find_one({"_id": WATERMARK_ID})
+    return doc["updated_at"] if doc else None
+
+
+def save_watermark(value):
+    db.consistency_watermarks.update_one(
+        {"_id": WATERMARK_ID},
+        {"$set": {"updated_at": value}},
+        upsert=True,
+    )
+
+
+def incremental_report(chunk_size=500, workers=4):
+    """
+    Re-check only showtimes and bookings written since the last run, then move the watermark.
+
+    With no watermark yet this runs the full check and starts one.
+    """
+    started = datetime.now()
+    run_start = datetime.now(timezone.utc).replace(tzinfo=None)  # updated_at is stored as naive UTC
+    watermark = load_watermark()
+
+    if watermark is None:
+        report = full_report(chunk_size=chunk_size, workers=workers)
+    else:
+        changed = {"updated_at": {"$gte": watermark}}
+
+        # Showtimes whose seats changed, plus those of bookings that changed
+        showtime_ids = {st["_id"] for st in db.showtimes.find(changed, {"_id": 1})}
+        showtime_ids.update(sid for sid in db.bookings.distinct("showtime_id", changed) if sid)
+        movie_ids = {
+            st["movie_id"] for st in db.showtimes.find({"_id": {"$in": list(showtime_ids)}}, {"movie_id": 1})
+        }
+
+        problems = []
+        if showtime_ids:
+            problems += check_showtimes(
+                {"_id": {"$in": list(showtime_ids)}},
+                chunk_size=chunk_size,
+                workers=workers,
+                legacy_movie_ids=movie_ids,
+            )
+        problems += check_booking_references(changed)
+        report = build_report(
+            problems, started,
+            mode="incremental",
+            since=watermark.isoformat(),
+            showtimes_checked=len(showtime_ids),
+        )
+
+    save_watermark(run_start - WATERMARK_OVERLAP)
+    return report
+
+
+def build_report(problems, started, **extra):
+    return {
+        **extra,
+        "started_at": started.isoformat(),
+        "duration_seconds": round((datetime.now() - started).total_seconds(), 3),
+        "consistent": not problems,
+        "counts": dict(Counter(p["check"] for p in problems)),
+        "problems": problems,
+    }
+
+
+# ------------------------
+# REPAIR MODE
+# ------------------------
+
+# Showtimes written more recently than this are left alone (reservations in flight)
+REPAIR_GRACE = timedelta(minutes=2)
+
+
+def plan_repairs(problems):
+    """
+    Turn check problems into a list of seat repairs (the dry-run diff).
+
+    release    orphaned sold/held seats go back to available
+    mark_sold  seats of confirmed bookings that are still available become sold
+    Everything else (double bookings, seats held by someone else...) needs a human.
+    """
+    plan = []
+    for problem in problems:
+        if problem["check"] in ("sold_without_booking", "held_without_booking"):
+            plan.append({
+                "action": "release",
+                "showtime_id": problem["showtime_id"],
+                "seats": problem["seats"],
+                "from_status": "sold" if problem["check"] == "sold_without_booking" else "held",
+            })
+        elif problem["check"] == "booked_not_sold":
+            seats = [seat for seat in problem["seats"] if problem["seat_status"].get(seat) == "available"]
+            if seats:
+                plan.append({
+                    "action": "mark_sold",
+                    "showtime_id": problem["showtime_id"],
+                    "seats": seats,
+                    "booking_ids": {seat: problem["booking_ids"][seat] for seat in seats},
+                })
+    return plan
+
+
+def _repair_operation(repair, cutoff):
+    seats = repair["seats"]
+    expected_status = repair["from_status"] if repair["action"] == "release" else "available"
+    query = {
+        "_id": ObjectId(repair["showtime_id"]),
+        "seats": {"$all": [{"$elemMatch": {"seat": seat, "status": expected_status}} for seat in seats]},
+        "$or": [{"updated_at": {"$lt": cutoff}}, {"updated_at": {"$exists": False}}],
+    }
+
+    if repair["action"] == "release":
+        update = track_seat_change({
+            "$set": {"seats.$[s].status": "available"},
+            "$unset": {"seats.$[s].booking_id": "", "seats.$[s].hold_expires_at": ""},
+        }, seats, taken=False)
+        return UpdateOne(query, update, array_filters=[{"s.seat": {"$in": seats}}])
+
+    # mark_sold: each seat gets its own booking id, so one array filter per seat
+    update = {"$set": {}}
+    array_filters = []
+    for i, seat in enumerate(seats):
+        update["$set"][f"seats.$[s{i}].status"] = "sold"
+        update["$set"][f"seats.$[s{i}].booking_id"] = ObjectId(repair["booking_ids"][seat])
+        array_filters.append({f"s{i}.seat": seat})
+    return UpdateOne(query, track_seat_change(update, seats, taken=True), array_filters=array_filters)
+
+
+def apply_repairs(plan, batch_size=1000):
+    """Send the planned repairs as unordered bulk_writes. Returns {"planned", "applied", "skipped"}."""
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - REPAIR_GRACE
+    applied = 0
+    for start in range(0, len(plan), batch_size):
+        operations = [_repair_operation(repair, cutoff) for repair in plan[start:start + batch_size]]
+        applied += db.showtimes.bulk_write(operations, ordered=False).modified_count
+    # Skipped: the seats changed since the check, or the showtime is too fresh to touch
+    return {"planned": len(plan), "applied": applied, "skipped": len(plan) - applied}
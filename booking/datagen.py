@@ -0,0 +1,309 @@
+"""
+Synthetic data generator for capacity planning.
+
+setup_database.py seeds a handful of documents for the demo. This builds a
+cinema chain of any size instead: venues with screens, showtimes every day,
+and confirmed bookings filling a share of their seats, paid along a chosen
+curve before each show. By default the shows run up to yesterday, so the
+sales history ends today.
+
+    python manage.py generate_data --venues 50 --screens 10 --days 60 --seed 7
+
+Everything is derived from the seed: ObjectIds are hashed from (seed, kind,
+position) and each venue-day gets its own RNG, so the same knobs always give
+the same data no matter how the work is spread over processes. That also
+makes a run resumable: documents that already exist are skipped as duplicate
+keys.
+
+Venue-days are generated by a process pool. Each worker gets its own client
+from mongo_db.get_db() and writes in batched insert_many(ordered=False)
+calls. The documents have the same shape as the ones the app writes, seat
+bitmaps included.
+
+Workers only read settings.MONGODB; they never call django.setup().
+"""
+
+import hashlib
+import math
+import multiprocessing
+import random
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from .mongo_db import get_db
+from .seatmap import encode_seat_map
+
+CITIES = ["Quezon City", "Makati City", "Pasig City", "Taguig City", "Manila", "Cebu City", "Davao City"]
+FEATURES = ["Dolby Surround", "IMAX", "4DX", "VIP Lounge", "Premium Recliners", "Wheelchair Accessible"]
+GENRES = ["Action", "Comedy", "Drama", "Sci-Fi", "Horror", "Animation", "Romance"]
+RATINGS = ["G", "PG", "PG-13", "R-16"]
+
+SEATS_PER_ROW = 20
+SALES_WINDOW = timedelta(days=14)      # tickets go on sale this long before the show
+FIRST_SHOW_HOUR, LAST_SHOW_HOUR = 10, 23
+DUPLICATE_KEY = 11000
+
+# Collections generate() writes (and `--drop` clears)
+GENERATED_COLLECTIONS = ("venues", "movies", "users", "showtimes", "bookings")
+
+# When in the sales window each booking is paid: maps u in [0, 1) to the
+# elapsed share of the window (0 = on-sale moment, 1 = showtime)
+PAYMENT_CURVES = {
+    "uniform": lambda u: u,
+    "late": lambda u: u ** (1 / 3),     # most tickets sold close to the show
+    "onsale": lambda u: u ** 3,         # rush right after tickets go on sale
+}
+
+
+@dataclass
+class GeneratorConfig:
+    venues: int = 10
+    screens: int = 8
+    seats_per_screen: int = 300
+    shows_per_day: int = 5
+    days: int = 30
+    start: datetime = None
+    movies: int = 40
+    users: int = 100_000
+    density: float = 0.6        # average share of seats sold per showtime
+    payment_curve: str = "late"
+    seed: int = 42
+    batch_size: int = 5000
+
+
+def default_start(days):
+    """
+    First show day when none is given: `days` days back, so the last shows
+    were yesterday. Every payment then lies in the past, where the dashboard's
+    date ranges (and rollup_daily) expect it.
+    """
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days)
+
+
+def object_id(seed, kind, *position):
+    """Deterministic ObjectId for the `position`-th document of `kind`."""
+    digest = hashlib.blake2b(repr((seed, kind) + position).encode(), digest_size=12).digest()
+    return ObjectId(digest)
+
+
+def row_label(index):
+    """0 -> 'A', 25 -> 'Z', 26 -> 'AA' ..."""
+    label = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        label = chr(ord("A") + remainder) + label
+    return label
+
+
+def seat_labels(count):
+    return [f"{row_label(i // SEATS_PER_ROW)}{i % SEATS_PER_ROW + 1}" for i in range(count)]
+
+
+# ------------------------
+# CATALOG (main process)
+# ------------------------
+
+def build_venues(config):
+    rng = random.Random(f"{config.seed}:venues")
+    venues = []
+    for i in range(config.venues):
+        city = rng.choice(CITIES)
+        venues.append({
+            "_id": object_id(config.seed, "venue", i),
+            "name": f"Absolut Cinema - {city} {i + 1}",
+            "city": city,
+            "address": f"{rng.randint(1, 999)} Main Street",
+            "contact_number": f"09{rng.randint(10**8, 10**9 - 1)}",
+            "email": f"venue{i + 1}@absolutcinema.com",
+            "features": rng.sample(FEATURES, k=rng.randint(1, 3)),
+        })
+    return venues
+
+
+def build_movies(config):
+    rng = random.Random(f"{config.seed}:movies")
+    return [
+        {
+            "_id": object_id(config.seed, "movie", i),
+            "title": f"Feature #{i + 1}",
+            "description": "Generated for load testing.",
+            "genre": rng.choice(GENRES),
+            "runtime_mins": rng.randint(85, 180),
+            "rated": rng.choice(RATINGS),
+            "release_date": datetime(2020, 1, 1) + timedelta(days=rng.randint(0, 2000)),
+            "director": f"Director {rng.randint(1, 500)}",
+        }
+        for i in range(config.movies)
+    ]
+
+
+def build_users(config, start, stop):
+    return [
+        {
+            "_id": object_id(config.seed, "user", i),
+            "name": f"User {i + 1}",
+            "email": f"user{i + 1}@example.com",
+            "tickets": [],
+        }
+        for i in range(start, stop)
+    ]
+
+
+# ------------------------
+# SHOWTIMES + BOOKINGS (workers)
+# ------------------------
+
+_db = None
+
+
+def _connect():
+    # Pool initializer: the worker's own client
+    global _db
+    _db = get_db()
+
+
+def insert_batch(collection, documents):
+    """insert_many(ordered=False) that skips documents already there. Returns how many were inserted."""
+    if not documents:
+        return 0
+    try:
+        return len(collection.insert_many(documents, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+            raise
+        return e.details["nInserted"]
+
+
+def build_showtime(config, rng, venue_index, day, screen, show, labels):
+    """One showtime and its confirmed bookings."""
+    seed = config.seed
+    showtime_id = object_id(seed, "showtime", venue_index, day, screen, show)
+    movie_id = object_id(seed, "movie", rng.randrange(config.movies))
+    venue_id = object_id(seed, "venue", venue_index)
+
+    slot = (LAST_SHOW_HOUR - FIRST_SHOW_HOUR) * 60 // max(config.shows_per_day, 1)
+    schedule = config.start + timedelta(days=day, minutes=(FIRST_SHOW_HOUR * 60 + show * slot) // 15 * 15)
+    price = rng.randrange(350, 560, 10)
+
+    # Walk the seats, starting a group booking (1-5 adjacent seats in a row) with
+    # probability p, which on average sells `occupancy` of the seats
+    occupancy = min(max(rng.gauss(config.density, 0.2), 0.0), 0.98)
+    start_probability = occupancy / (3 - 2 * occupancy) if occupancy else 0
+    curve = PAYMENT_CURVES[config.payment_curve]
+
+    seats = [{"seat": label, "status": "available"} for label in labels]
+    bookings = []
+    i = 0
+    while i < len(seats):
+        if rng.random() >= start_probability:
+            i += 1
+            continue
+        row_end = (i // SEATS_PER_ROW + 1) * SEATS_PER_ROW
+        group = seats[i:min(i + rng.randint(1, 5), row_end, len(seats))]
+        i += len(group)
+
+        booking_id = object_id(seed, "booking", venue_index, day, screen, show, len(bookings))
+        for seat in group:
+            seat.update(status="sold", booking_id=booking_id)
+
+        on_sale = schedule - SALES_WINDOW
+        paid_at = min(on_sale + SALES_WINDOW * curve(rng.random()), schedule - timedelta(minutes=1))
+        paid_at = paid_at.replace(microsecond=0)
+        bookings.append({
+            "_id": booking_id,
+            "user_id": object_id(seed, "user", rng.randrange(config.users)),
+            "movie_id": movie_id,
+            "venue_id": venue_id,
+            "showtime_id": showtime_id,
+            "seats": [seat["seat"] for seat in group],
+            "total_price": len(group) * price,
+            "booking_confirmed": True,
+            "payment": {"payment_method": rng.choice(["gcash", "card"]), "paid_at": paid_at},
+            "ticket": {
+                "ticket_ref": f"GEN-{str(booking_id).upper()}",
+                "issued": paid_at + timedelta(seconds=rng.randint(5, 180)),
+                "status": "active",
+            },
+            "updated_at": paid_at,
+        })
+
+    showtime = {
+        "_id": showtime_id,
+        "movie_id": movie_id,
+        "venue_id": venue_id,
+        "screen_name": f"Cinema {screen + 1}",
+        "schedule": schedule,
+        "price": price,
+        "seats": seats,
+        "seat_version": 0,
+    }
+    showtime.update(encode_seat_map(seats) or {})
+    return showtime, bookings
+
+
+def generate_venue_day(task):
+    """Worker: every showtime of one venue on one day. Returns (showtimes inserted, seats generated, bookings inserted)."""
+    config, venue_index, day = task
+    config = GeneratorConfig(**config)
+    rng = random.Random(f"{config.seed}:{venue_index}:{day}")
+    labels = seat_labels(config.seats_per_screen)
+
+    showtimes, bookings = [], []
+    counts = [0, 0, 0]
+
+    def flush():
+        counts[0] += insert_batch(_db.showtimes, showtimes)
+        counts[2] += insert_batch(_db.bookings, bookings)
+        showtimes.clear()
+        bookings.clear()
+
+    for screen in range(config.screens):
+        for show in range(config.shows_per_day):
+            showtime, showtime_bookings = build_showtime(config, rng, venue_index, day, screen, show, labels)
+            showtimes.append(showtime)
+            bookings.extend(showtime_bookings)
+            counts[1] += len(labels)
+            # Showtimes are ~seats_per_screen times bigger than a booking, so batch them by seat count
+            if len(showtimes) * len(labels) >= config.batch_size * 10 or len(bookings) >= config.batch_size:
+                flush()
+    flush()
+    return tuple(counts)
+
+
+def generate(config, workers=None, progress=None):
+    """
+    Write the whole data set. Returns a dict of document counts inserted.
+
+    `progress(done, total)` is called after each venue-day finishes.
+    """
+    _connect()
+    counts = {
+        "venues": insert_batch(_db.venues, build_venues(config)),
+        "movies": insert_batch(_db.movies, build_movies(config)),
+        "users": 0,
+        "showtimes": 0,
+        "seats": 0,
+        "bookings": 0,
+    }
+    for start in range(0, config.users, config.batch_size):
+        counts["users"] += insert_batch(_db.users, build_users(config, start, min(start + config.batch_size, config.users)))
+
+    tasks = [(asdict(config), v, d) for v in range(config.venues) for d in range(config.days)]
+    # spawn, not fork: forking while the client's monitor threads run can deadlock the child
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, initializer=_connect) as pool:
+        chunksize = max(1, math.ceil(len(tasks) / ((workers or multiprocessing.cpu_count()) * 8)))
+        for done, (showtimes, seats, bookings) in enumerate(
+            pool.imap_unordered(generate_venue_day, tasks, chunksize=chunksize), start=1
+        ):
+            counts["showtimes"] += showtimes
+            counts["seats"] += seats
+            counts["bookings"] += bookings
+            if progress:
+                progress(done, len(tasks))
+    return counts
@@ -0,0 +1,121 @@
+"""
+Every MongoDB index Absolut Cinema relies on, in one place.
+
+Each entry is tied to the query that needs it (see query_audit.QUERIES for
+the exact shapes). `python manage.py ensure_indexes`
+creates whatever is missing and reports drift (indexes that differ from this
+registry, or exist in the database without being declared here).
+
+When you add a query with a new shape, add its index here too, and drop
+indexes whose query is gone: every index slows down every write.
+`ensure_indexes --drop-undeclared` removes the ones taken out of here.
+"""
+
+from pymongo import ASCENDING, IndexModel
+
+# How long an abandoned unpaid booking may linger if the hold reaper never
+# released it. The TTL monitor deletes it after that; check_consistency's repair
+# mode then frees the seats it still holds.
+ABANDONED_BOOKING_TTL_SECONDS = 7 * 24 * 60 * 60
+
+INDEXES = {
+    "bookings": [
+        # release_expired_holds: unpaid bookings whose hold ran out (TTL as a backstop)
+        IndexModel(
+            [("hold_expires_at", ASCENDING)],
+            name="pending_hold_expiry",
+            expireAfterSeconds=ABANDONED_BOOKING_TTL_SECONDS,
+            partialFilterExpression={"booking_confirmed": False},
+        ),
+        # consistency checks: all bookings of a showtime (and, through its null
+        # entries, the legacy bookings without one) / bookings changed since the last run
+        IndexModel([("showtime_id", ASCENDING)], name="showtime"),
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+        # consistency checks: bookings of users that no longer exist
+        IndexModel([("user_id", ASCENDING)], name="user"),
+        # analytics_data with a date range: the $match on payment.paid_at
+        # (all-time totals come from the rollups, so movie_id / venue_id need no index)
+        IndexModel([("payment.paid_at", ASCENDING)], name="paid_at"),
+        # ticket references are shown to customers, so they must never repeat
+        IndexModel(
+            [("ticket.ticket_ref", ASCENDING)],
+            name="ticket_ref_unique",
+            unique=True,
+            partialFilterExpression={"ticket.ticket_ref": {"$exists": True}},
+        ),
+    ],
+    "showtimes": [
+        # consistency checks: seed bookings resolved to their showtime by movie + venue + schedule
+        # (a movie plays a venue dozens of times, so the schedule has to be in the key too)
+        IndexModel([("movie_id", ASCENDING), ("venue_id", ASCENDING), ("schedule", ASCENDING)], name="movie_venue"),
+        # check_consistency --incremental: showtimes changed since the last run
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+    "system_users": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+}
+
+# Index options that matter when comparing the registry with the database
+COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+def _spec(document):
+    # Normalise an IndexModel.document or an index_information() entry for comparison
+    keys = document["key"]
+    keys = list(keys.items()) if hasattr(keys, "items") else list(keys)
+    spec = {"key": [(field, int(direction)) for field, direction in keys]}
+    for option in COMPARED_OPTIONS:
+        if document.get(option) not in (None, False):
+            spec[option] = document[option]
+    return spec
+
+
+def index_drift(db):
+    """
+    Compare the registry with the database without changing anything.
+
+    Returns a list of (collection, index name, problem) tuples, where problem
+    is "missing", "different" or "undeclared".
+    """
+    drift = []
+    for collection, models in INDEXES.items():
+        existing = db[collection].index_information()
+        declared = {model.document["name"]: model.document for model in models}
+
+        for name, document in declared.items():
+            if name not in existing:
+                drift.append((collection, name, "missing"))
+            elif _spec(existing[name]) != _spec(document):
+                drift.append((collection, name, "different"))
+
+        for name in existing:
+            if name != "_id_" and name not in declared:
+                drift.append((collection, name, "undeclared"))
+    return drift
+
+
+def ensure_indexes(db, rebuild_different=False, drop_undeclared=False):
+    """
+    Bring the database in line with the registry. Safe to run any number of times.
+
+    Missing indexes are always created. Indexes whose definition changed are only
+    dropped and rebuilt with `rebuild_different`, undeclared ones only dropped
+    with `drop_undeclared`. Returns the drift found before any change.
+    """
+    drift = index_drift(db)
+    for collection, name, problem in drift:
+        if problem == "different" and rebuild_different:
+            db[collection].drop_index(name)
+        elif problem == "undeclared" and drop_undeclared:
+            db[collection].drop_index(name)
+
+    for collection, models in INDEXES.items():
+        # create_indexes is a no-op for indexes that already exist as declared
+        to_create = [
+            model for model in models
+            if (collection, model.document["name"], "different") not in drift or rebuild_different
+        ]
+        if to_create:
+            db[collection].create_indexes(to_create)
+    return drift
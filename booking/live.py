@@ -0,0 +1,153 @@
+"""
+Live seat-map updates for the reserve page (Server-Sent Events).
+
+One SeatEventHub per process keeps track of which browsers are watching which
+showtime and fans every seat change out to all of them. Where the changes come
+from depends on settings.SEAT_EVENTS_SOURCE:
+
+- "change_stream": one background thread watches `showtimes` through a MongoDB
+  change stream (needs a replica set, e.g. Atlas). Sees changes made by every
+  process, including the hold reaper. Against a standalone server the watcher
+  switches the hub to "local" on its first attempt.
+- "local": the write paths in seats.py publish straight into the hub. Works
+  against a standalone mongod but only sees changes made in this process.
+
+Either way each change is turned into a payload once, however many browsers are
+listening, so open streams never cost a query per client.
+
+The stream endpoint is async and only streams with settings.LIVE_SEATS on,
+served through absolut_cinema/asgi.py (e.g. `uvicorn absolut_cinema.asgi:application`).
+Otherwise it answers 204 and the reserve page doesn't open it.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from pymongo.errors import OperationFailure
+
+from .mongo_db import db
+from .seatmap import compact_payload
+
+logger = logging.getLogger(__name__)
+
+# "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+# Fields a seat event needs: the compact map plus its version
+SEAT_EVENT_FIELDS = {"seat_rows": 1, "seat_bitmap": 1, "seat_version": 1}
+
+
+def seat_event(showtime):
+    """Payload pushed to browsers. Showtimes without a compact map only carry the version (the page refetches)."""
+    event = {"seat_version": showtime.get("seat_version", 0)}
+    if "seat_rows" in showtime:
+        event.update(compact_payload(showtime["seat_rows"], showtime.get("seat_bitmap", {})))
+    return event
+
+
+class SeatEventHub:
+    """Per-process fan-out of seat events from one upstream source to many asyncio queues."""
+
+    def __init__(self, source):
+        self.source = source
+        self._subscribers = {}  # showtime id (str) -> set of (loop, queue)
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    def subscribe(self, showtime_id):
+        """Register the running event loop's interest in a showtime. Returns the queue to read events from."""
+        queue = asyncio.Queue(maxsize=1)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(showtime_id, set()).add(entry)
+        if self.source == "change_stream":
+            self._ensure_watcher()
+        return queue
+
+    def unsubscribe(self, showtime_id, queue):
+        with self._lock:
+            entries = self._subscribers.get(showtime_id, set())
+            entries.difference_update({e for e in entries if e[1] is queue})
+            if not entries:
+                self._subscribers.pop(showtime_id, None)
+
+    def has_subscribers(self, showtime_id):
+        return showtime_id in self._subscribers
+
+    def broadcast(self, showtime_id, event):
+        """Hand `event` to every queue watching this showtime. Safe to call from any thread."""
+        with self._lock:
+            entries = list(self._subscribers.get(showtime_id, ()))
+        for loop, queue in entries:
+            loop.call_soon_threadsafe(_offer, queue, event)
+
+    def publish_change(self, showtime_oid, showtime=None):
+        """
+        Called by the seat write paths after a successful update ("local" source only).
+
+        `showtime` may already hold the SEAT_EVENT_FIELDS (reserve_seats gets
+        them back from find_one_and_update); otherwise they are read once here.
+        """
+        showtime_id = str(showtime_oid)
+        if self.source != "local" or not self.has_subscribers(showtime_id):
+            return
+        if showtime is None or "seat_version" not in showtime:
+            showtime = db.showtimes.find_one({"_id": showtime_oid}, SEAT_EVENT_FIELDS)
+            if not showtime:
+                return
+        self.broadcast(showtime_id, seat_event(showtime))
+
+    def _ensure_watcher(self):
+        with self._lock:
+            if self._watcher and self._watcher.is_alive():
+                return
+            self._watcher = threading.Thread(target=self._watch, name="seat-change-stream", daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        pipeline = [
+            {"$match": {"operationType": {"$in": ["update", "replace"]}}},
+            {"$project": {
+                "documentKey": 1,
+                **{f"fullDocument.{field}": 1 for field in SEAT_EVENT_FIELDS},
+            }},
+        ]
+        resume_token = None
+        while True:
+            try:
+                with db.showtimes.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                    for change in stream:
+                        resume_token = stream.resume_token
+                        showtime_id = str(change["documentKey"]["_id"])
+                        if change.get("fullDocument") and self.has_subscribers(showtime_id):
+                            self.broadcast(showtime_id, seat_event(change["fullDocument"]))
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAMS_UNSUPPORTED or "replica sets" in str(e):
+                    # Standalone mongod: no change streams, ever. Publish our own writes instead.
+                    logger.warning("Change streams not supported by this server, using local seat events")
+                    self.source = "local"
+                    return
+                logger.warning("Seat change stream interrupted, reconnecting: %s", e)
+                time.sleep(1)
+            except Exception as e:
+                # Network blips, elections... pick up again from the last event we saw
+                logger.warning("Seat change stream interrupted, reconnecting: %s", e)
+                time.sleep(1)
+
+
+def _offer(queue, event):
+    # Events are full snapshots, so a slow browser only ever needs the newest one
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+def format_sse(event):
+    return f"id: {event['seat_version']}\nevent: seats\ndata: {json.dumps(event)}\n\n"
+
+
+hub = SeatEventHub(getattr(settings, "SEAT_EVENTS_SOURCE", "change_stream"))
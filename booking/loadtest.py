@@ -0,0 +1,204 @@
+"""
+On-sale contention load test for reserve_seat_api.
+
+Models a blockbuster going on sale: thousands of customers fire overlapping
+POST /api/reserve/ requests at one showtime, most of them after the same few
+good rows. Requests run through Django's test client on a thread pool, so the
+whole stack (view, atomic seat update, booking insert) is exercised against
+the real MongoDB without a web server.
+
+Before the run, snapshot() records the bookings and taken seats the showtime
+already has (an existing --showtime comes with seed data). Afterwards
+verify_showtime checks only what the run changed:
+
+- no seat belongs to two bookings, and every seat taken during the run to
+  exactly one (check_showtime from consistency.py)
+- no booking of the run got a seat that was already sold
+- each booked seat carries its booking's _id
+- every accepted request has its booking, and no new booking exists without one
+- the seat bitmap matches the seats array
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bson import ObjectId
+from django.contrib.auth.models import User
+from django.test import Client
+
+from .benchmark import summarize
+from .consistency import check_showtime
+from .datagen import seat_labels
+from .mongo_db import db
+from .seatmap import encode_seat_map, split_seat
+
+LOAD_TEST_USERNAME = "loadtest-{}"
+
+
+def create_showtime(seats, template=None):
+    """A fresh on-sale showtime (copying movie/venue/price from `template`, if any). Returns its _id."""
+    template = template or db.showtimes.find_one({}, {"movie_id": 1, "venue_id": 1, "price": 1, "schedule": 1}) or {}
+    seat_list = [{"seat": label, "status": "available"} for label in seat_labels(seats)]
+    showtime = {
+        "movie_id": template.get("movie_id"),
+        "venue_id": template.get("venue_id"),
+        "screen_name": "Load test",
+        "schedule": template.get("schedule"),
+        "price": template.get("price", 400),
+        "seats": seat_list,
+        "seat_version": 0,
+        "load_test": True,
+    }
+    showtime.update(encode_seat_map(seat_list) or {})
+    return db.showtimes.insert_one(showtime).inserted_id
+
+
+def seat_rows(labels):
+    """Labels grouped into rows by their <row><number> label: rows A..Z, AA.. in order, seats by number."""
+    rows = {}
+    for label in labels:
+        parsed = split_seat(label)
+        # Labels that don't parse share one pseudo-row, in the order given
+        row, number = parsed if parsed else (None, len(rows.get(None, [])))
+        rows.setdefault(row, []).append((number, label))
+    order = sorted(rows, key=lambda row: (row is None, len(row or ""), row or ""))
+    return [[label for _, label in sorted(rows[row])] for row in order]
+
+
+def plan_requests(labels, count, seed, max_group=4, hot_share=0.8):
+    """
+    The seat groups each request asks for.
+
+    `hot_share` of requests go after the middle third of the rows (everybody
+    wants the same seats); the rest pick anywhere. Groups are adjacent seats
+    in one row, 1 to `max_group` of them.
+    """
+    rng = random.Random(seed)
+    rows = seat_rows(labels)
+    if not rows:
+        raise ValueError("No seats to plan requests for")
+    hot = rows[len(rows) // 3:max(2 * len(rows) // 3, len(rows) // 3 + 1)]
+    plan = []
+    for _ in range(count):
+        row = rng.choice(hot if rng.random() < hot_share else rows)
+        size = min(rng.randint(1, max_group), len(row))
+        start = rng.randrange(len(row) - size + 1)
+        plan.append(row[start:start + size])
+    return plan
+
+
+def run_load(showtime_id, plan, concurrency=50):
+    """
+    Fire every planned request, `concurrency` at a time. Returns a result dict:
+    accepted / conflicts / errors counts, accepted_per_second, conflict_rate,
+    latency percentiles and the booking ids handed out.
+    """
+    local = threading.local()
+    users = [User.objects.get_or_create(username=LOAD_TEST_USERNAME.format(i))[0] for i in range(concurrency)]
+    next_user = iter(range(concurrency))
+    lock = threading.Lock()
+
+    def client():
+        # One logged-in client per worker thread
+        if not hasattr(local, "client"):
+            with lock:
+                user = users[next(next_user)]
+            local.client = Client(raise_request_exception=False, HTTP_HOST="localhost")
+            local.client.force_login(user)
+        return local.client
+
+    def reserve(seats):
+        started = time.perf_counter()
+        response = client().post(
+            "/api/reserve/",
+            data={"showtime_id": str(showtime_id), "seat_ids": seats},
+            content_type="application/json",
+        )
+        elapsed = time.perf_counter() - started
+        booking_id = response.json().get("booking_id") if response.status_code == 200 else None
+        return response.status_code, elapsed, booking_id
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(reserve, plan))
+    wall = time.perf_counter() - started
+
+    accepted = [r for r in results if r[0] == 200]
+    conflicts = [r for r in results if r[0] == 400]
+    return {
+        "requests": len(results),
+        "accepted": len(accepted),
+        "conflicts": len(conflicts),
+        "errors": len(results) - len(accepted) - len(conflicts),
+        "wall_seconds": round(wall, 3),
+        "accepted_per_second": round(len(accepted) / wall, 1),
+        "requests_per_second": round(len(results) / wall, 1),
+        "conflict_rate": round(len(conflicts) / len(results), 4),
+        "latency": summarize([(elapsed, 0, status in (200, 400)) for status, elapsed, _ in results]),
+        "booking_ids": [booking_id for _, _, booking_id in accepted],
+    }
+
+
+def snapshot(showtime_id):
+    """What the showtime already had before a run: {"booking_ids", "taken", "sold"} (sets)."""
+    showtime = db.showtimes.find_one({"_id": showtime_id}, {"seats.seat": 1, "seats.status": 1}) or {}
+    seats = showtime.get("seats", [])
+    return {
+        "booking_ids": {b["_id"] for b in db.bookings.find({"showtime_id": showtime_id}, {"_id": 1})},
+        "taken": {s["seat"] for s in seats if s["status"] != "available"},
+        "sold": {s["seat"] for s in seats if s["status"] == "sold"},
+    }
+
+
+def verify_showtime(showtime_id, booking_ids, before=None):
+    """
+    Problems found in the showtime and its bookings after a load run (empty list = all good).
+
+    `before` is the snapshot() taken ahead of the run: seats and bookings that
+    were already there are left out of the checks.
+    """
+    before = before or {"booking_ids": set(), "taken": set(), "sold": set()}
+    showtime = db.showtimes.find_one({"_id": showtime_id})
+    bookings = [
+        booking for booking in db.bookings.find({"showtime_id": showtime_id})
+        if booking["_id"] not in before["booking_ids"]
+    ]
+    # Seats that were free when the run started, plus any the run's bookings hold now
+    # (an old hold the reaper released mid-run may legitimately be resold)
+    new_ids = {booking["_id"] for booking in bookings}
+    problems = check_showtime(
+        {**showtime, "seats": [
+            s for s in showtime["seats"]
+            if s["seat"] not in before["taken"] or s.get("booking_id") in new_ids
+        ]},
+        bookings,
+    )
+
+    owner = {s["seat"]: s.get("booking_id") for s in showtime["seats"]}
+    for booking in bookings:
+        resold = sorted(set(booking["seats"]) & before["sold"])
+        if resold:
+            problems.append({"check": "already_sold_seat_booked", "booking_id": str(booking["_id"]), "seats": resold})
+        wrong = [seat for seat in booking["seats"] if owner.get(seat) != booking["_id"]]
+        if wrong:
+            problems.append({"check": "seat_owned_by_other_booking", "booking_id": str(booking["_id"]), "seats": wrong})
+
+    accepted = {ObjectId(booking_id) for booking_id in booking_ids}
+    stored = {booking["_id"] for booking in bookings}
+    if accepted - stored:
+        problems.append({"check": "accepted_without_booking", "bookings": sorted(map(str, accepted - stored))})
+    if stored - accepted:
+        problems.append({"check": "booking_without_acceptance", "bookings": sorted(map(str, stored - accepted))})
+
+    encoded = encode_seat_map(showtime["seats"])
+    if encoded and encoded["seat_bitmap"] != showtime.get("seat_bitmap"):
+        problems.append({"check": "bitmap_mismatch", "showtime_id": str(showtime_id)})
+    return problems
+
+
+def cleanup(showtime_id):
+    """Remove a load-test showtime and its bookings."""
+    db.bookings.delete_many({"showtime_id": showtime_id})
+    db.showtimes.delete_one({"_id": showtime_id, "load_test": True})
@@ -0,0 +1,177 @@
+"""
+Structured logging for Absolut Cinema (wired up by settings.LOGGING).
+
+    import logging
+    logger = logging.getLogger(__name__)
+
+    logger.debug("Seats held", extra={"showtime_id": showtime_id, "seats": seats})
+
+Every record is written as one JSON line:
+
+    {"ts": "2026-10-18T12:00:00.123+00:00", "level": "DEBUG", "logger": "booking.views",
+     "message": "Seats held", "request_id": "3f2a...", "showtime_id": "...", "seats": ["A1"]}
+
+- RequestIdMiddleware gives each request an id (the caller's X-Request-ID,
+  or a fresh one), echoes it back in the response and stamps it on every
+  record logged while the request is handled.
+- QueueJsonHandler only puts records on a bounded queue. A background thread
+  formats and writes them, so a request never waits on stdout/stderr; when
+  the queue is full, records are dropped instead of blocking (and counted
+  in the log_records_dropped_total metric).
+- SamplingFilter keeps LOG_DEBUG_SAMPLE_RATE of the requests' DEBUG records.
+  The choice is made per request id, so a sampled request keeps all of its
+  DEBUG lines. WARNING and above always go through.
+
+With LOG_LEVEL above DEBUG, a logger.debug() call is a level check and
+nothing else. Pass values as `extra` or %-args rather than f-strings, so
+nothing is formatted unless the record is kept.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import LOG_RECORDS_DROPPED
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+_request_id = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+def get_request_id():
+    """Id of the request being handled in this thread or task (None outside a request)."""
+    return _request_id.get()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, message, request_id, extras and exc."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        # ObjectIds, datetimes and the like come out as their str()
+        return json.dumps(entry, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps the current request id on each record (runs in the calling thread, before queueing)."""
+
+    def filter(self, record):
+        # django.request logs 4xx/5xx after the middleware has returned, but passes the request along
+        request = getattr(record, "request", None)
+        record.request_id = _request_id.get() or getattr(request, "request_id", None)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps every record above DEBUG and `rate` of the DEBUG ones, chosen per request."""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = float(rate)
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        request_id = getattr(record, "request_id", None) or _request_id.get()
+        if request_id:
+            # Same answer for every record of a request: its lines are kept or dropped together
+            return zlib.crc32(request_id.encode()) / 0xFFFFFFFF < self.rate
+        return random.random() < self.rate
+
+
+class QueueJsonHandler(QueueHandler):
+    """
+    Non-blocking handler: records go on a bounded in-memory queue and a
+    QueueListener thread writes them as JSON lines to `stream` (stderr).
+    """
+
+    def __init__(self, stream=None, maxsize=10_000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        target = logging.StreamHandler(stream or sys.stderr)
+        target.setFormatter(JsonFormatter())
+        self.listener = QueueListener(self.queue, target, respect_handler_level=False)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def prepare(self, record):
+        # Render the message and traceback now (args may change after we return),
+        # but leave the JSON formatting to the listener thread
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+class RequestIdMiddleware:
+    """Assigns every request an id (sync and async); see the module docstring."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_id.reset(token)
+        response[REQUEST_ID_HEADER] = request.request_id
+        return response
+
+    async def _acall(self, request):
+        token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_id.reset(token)
+        response[REQUEST_ID_HEADER] = request.request_id
+        return response
+
+    def _start(self, request):
+        incoming = request.headers.get(REQUEST_ID_HEADER, "")
+        # Trust a caller's id (e.g. from the load balancer) only if it looks like one
+        if not (8 <= len(incoming) <= 64 and all(c in "0123456789abcdefABCDEF-" for c in incoming)):
+            incoming = uuid.uuid4().hex
+        request.request_id = incoming
+        return _request_id.set(incoming)
@@ -0,0 +1,66 @@
+"""
+Explain every query shape of the app and the consistency checks, and fail on
+collection scans or wasteful index use (see booking/query_audit.py).
+
+    python manage.py audit_query_plans                    # exit 1 on a COLLSCAN or examined/returned > 10
+    python manage.py audit_query_plans --max-ratio 50
+    python manage.py audit_query_plans --strict           # deliberate full scans fail too
+    python manage.py audit_query_plans --output plans.json
+
+Run it against a seeded database (`python manage.py generate_data`) after
+`ensure_indexes`, e.g. in CI before a deploy. It only runs explain(), so
+nothing is written.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.mongo_db import db
+from booking.query_audit import DEFAULT_MAX_RATIO, QUERIES, audit
+
+
+class Command(BaseCommand):
+    help = "Explain every query shape and fail on COLLSCANs or a high examined/returned ratio."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-ratio", type=float, default=DEFAULT_MAX_RATIO,
+            help="Most keys/documents examined per document returned (default: %(default)s).",
+        )
+        parser.add_argument("--strict", action="store_true", help="Also fail on queries that scan a collection on purpose.")
+        parser.add_argument(
+            "--only", action="append", choices=[query["name"] for query in QUERIES], metavar="NAME",
+            help="Only explain this query (repeatable).",
+        )
+        parser.add_argument("--output", help="Also write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        try:
+            results = audit(db, max_ratio=options["max_ratio"], strict=options["strict"], names=options["only"])
+        except LookupError as e:
+            raise CommandError(str(e))
+
+        for result in results:
+            if result["problems"]:
+                status = self.style.ERROR("FAIL")
+            elif result["collscan"]:
+                status = self.style.WARNING("SCAN")  # deliberate full scan
+            else:
+                status = self.style.SUCCESS(" ok ")
+            self.stdout.write(
+                f"{status} {result['collection']:<13} {result['name']:<40} {result['plan']}\n"
+                f"       keys {result['keys_examined']}, docs {result['docs_examined']},"
+                f" returned {result['returned']}, ratio {result['ratio']}   ({result['source']})"
+            )
+            for problem in result["problems"]:
+                self.stdout.write(f"       -> {problem}")
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+
+        failed = [result for result in results if result["problems"]]
+        if failed:
+            raise CommandError(f"{len(failed)} of {len(results)} query plan(s) failed the audit")
+        self.stdout.write(self.style.SUCCESS(f"All {len(results)} query plans use their indexes"))
@@ -0,0 +1,87 @@
+"""
+Benchmark every booking view at one or more dataset sizes (see booking/benchmark.py).
+
+    python manage.py benchmark_endpoints                             # the data already loaded
+    MONGO_DB_NAME=absolut_cinema_bench python manage.py benchmark_endpoints --sizes small medium
+    python manage.py benchmark_endpoints --compare benchmark_baseline.json --output latest.json
+
+--sizes drops and regenerates the data for each size, so it refuses to run
+unless the database name contains "bench" (or --force is given).
+The JSON report is written to --output; pass an older report to --compare
+to see how p95 latency and round trips moved.
+"""
+
+import json
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.analytics import rebuild_rollups
+from booking.benchmark import SIZES, EndpointBenchmark, compare
+from booking.datagen import GENERATED_COLLECTIONS, GeneratorConfig, default_start, generate
+from booking.indexes import ensure_indexes
+from booking.mongo_db import db
+
+
+class Command(BaseCommand):
+    help = "Measure p50/p95/p99 latency, throughput and MongoDB round trips of the booking views."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", choices=list(SIZES), help="Regenerate data at each size and benchmark it.")
+        parser.add_argument("--iterations", type=int, default=100, help="Purchase flows per size.")
+        parser.add_argument("--warmup", type=int, default=5, help="Unrecorded flows run first.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--workers", type=int, default=None, help="Processes for data generation.")
+        parser.add_argument("--output", default="benchmark_baseline.json")
+        parser.add_argument("--compare", metavar="BASELINE", help="Earlier report to compare against.")
+        parser.add_argument("--force", action="store_true", help="Allow --sizes on a database not named *bench*.")
+
+    def handle(self, *args, **options):
+        if options["sizes"] and "bench" not in db.name and not options["force"]:
+            raise CommandError(
+                f"--sizes would wipe {db.name!r}; point MONGO_DB_NAME at a *bench* database or pass --force"
+            )
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+
+        report = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "database": db.name,
+            "iterations": options["iterations"],
+            "sizes": {},
+        }
+        for size in options["sizes"] or ["current"]:
+            if size != "current":
+                self.stdout.write(f"Generating {size} data set...")
+                for collection in GENERATED_COLLECTIONS:
+                    db.drop_collection(collection)
+                config = GeneratorConfig(
+                    **SIZES[size],
+                    start=default_start(SIZES[size]["days"]),
+                    seed=options["seed"],
+                )
+                generate(config, workers=options["workers"])
+                ensure_indexes(db)
+                rebuild_rollups()
+
+            dataset = {name: db[name].estimated_document_count() for name in GENERATED_COLLECTIONS}
+            self.stdout.write(f"Benchmarking {size}: {dataset}")
+            endpoints = EndpointBenchmark(options["iterations"], options["warmup"]).run()
+            report["sizes"][size] = {"dataset": dataset, "endpoints": endpoints}
+
+            for name, stats in endpoints.items():
+                self.stdout.write(
+                    f"  {name:<24} p50 {stats['p50_ms']:>8.2f}  p95 {stats['p95_ms']:>8.2f}  p99 {stats['p99_ms']:>8.2f} ms"
+                    f"  {stats['throughput_rps'] or 0:>7.1f} req/s  {stats['mongo_round_trips']:>5} round trips"
+                    f"  {stats['errors']} error(s)"
+                )
+
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+        if baseline:
+            for line in compare(baseline, report):
+                self.stdout.write(line)
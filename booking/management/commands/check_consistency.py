@@ -0,0 +1,58 @@
+"""
+Check that showtime seat maps and bookings agree (see booking/consistency.py).
+
+    python manage.py check_consistency                       # JSON report on stdout
+    python manage.py check_consistency --output report.json --workers 8
+    python manage.py check_consistency --incremental         # only what changed since the last run
+    python manage.py check_consistency --repair              # also show the fixes it would make
+    python manage.py check_consistency --repair --apply      # ...and make them
+
+Exits with status 1 when any problem is found, so it can gate a deploy or page someone.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.consistency import apply_repairs, full_report, incremental_report, plan_repairs
+
+
+class Command(BaseCommand):
+    help = "Check seat maps against bookings and booking references, and emit a JSON report."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument("--workers", type=int, default=4, help="Showtime chunks checked in parallel.")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Showtimes per chunk.")
+        parser.add_argument(
+            "--incremental", action="store_true",
+            help="Only re-check showtimes and bookings written since the previous incremental run.",
+        )
+        parser.add_argument("--repair", action="store_true", help="Add the seat repairs that would fix the problems (dry run).")
+        parser.add_argument("--apply", action="store_true", help="With --repair: actually apply them.")
+
+    def handle(self, *args, **options):
+        if options["apply"] and not options["repair"]:
+            raise CommandError("--apply only makes sense together with --repair")
+
+        run = incremental_report if options["incremental"] else full_report
+        report = run(chunk_size=options["chunk_size"], workers=options["workers"])
+
+        if options["repair"]:
+            report["repairs"] = plan_repairs(report["problems"])
+            if options["apply"]:
+                report["repair_result"] = apply_repairs(report["repairs"])
+
+        self.emit(report, options["output"])
+
+        if not report["consistent"]:
+            raise CommandError(f"Found {len(report['problems'])} problem(s): {report['counts']}")
+
+    def emit(self, report, output):
+        text = json.dumps(report, indent=2)
+        if output:
+            with open(output, "w") as f:
+                f.write(text)
+            self.stderr.write(f"Report written to {output}")
+        else:
+            self.stdout.write(text)
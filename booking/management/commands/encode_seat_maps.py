@@ -0,0 +1,43 @@
+"""
+Backfill the compact `seat_rows` / `seat_bitmap` fields on existing showtimes.
+
+    python manage.py encode_seat_maps          # only showtimes without a bitmap
+    python manage.py encode_seat_maps --all    # rebuild every bitmap from its seats array
+
+Run it while nobody is reserving: the bitmap is rebuilt from a snapshot of the
+seats array, so a reservation landing in between would be overwritten.
+"""
+
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from booking.mongo_db import db
+from booking.seatmap import encode_seat_map
+
+
+class Command(BaseCommand):
+    help = "Store a compact per-row seat bitmap on every showtime."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Rebuild bitmaps that already exist too.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        query = {} if options["all"] else {"seat_rows": {"$exists": False}}
+        cursor = db.showtimes.find(query, {"seats.seat": 1, "seats.status": 1})
+
+        encoded = skipped = 0
+        batch = []
+        for showtime in cursor:
+            fields = encode_seat_map(showtime.get("seats", []))
+            if not fields:
+                skipped += 1
+                continue
+            batch.append(UpdateOne({"_id": showtime["_id"]}, {"$set": fields}))
+            if len(batch) >= options["batch_size"]:
+                encoded += db.showtimes.bulk_write(batch, ordered=False).modified_count
+                batch = []
+        if batch:
+            encoded += db.showtimes.bulk_write(batch, ordered=False).modified_count
+
+        self.stdout.write(f"Encoded {encoded} showtime(s), skipped {skipped} with unencodable seat labels")
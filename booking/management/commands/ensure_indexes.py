@@ -0,0 +1,41 @@
+"""
+Create the MongoDB indexes declared in booking/indexes.py and report drift.
+
+    python manage.py ensure_indexes            # create missing indexes
+    python manage.py ensure_indexes --check    # report only, exit 1 on drift (for CI / deploys)
+    python manage.py ensure_indexes --rebuild-different --drop-undeclared
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.indexes import ensure_indexes, index_drift
+from booking.mongo_db import db
+
+
+class Command(BaseCommand):
+    help = "Create every declared MongoDB index and report indexes that drifted from the registry."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Don't change anything, exit 1 if anything drifted.")
+        parser.add_argument("--rebuild-different", action="store_true", help="Drop and recreate indexes whose definition changed.")
+        parser.add_argument("--drop-undeclared", action="store_true", help="Drop indexes that aren't in the registry.")
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            drift = index_drift(db)
+        else:
+            drift = ensure_indexes(
+                db,
+                rebuild_different=options["rebuild_different"],
+                drop_undeclared=options["drop_undeclared"],
+            )
+
+        for collection, name, problem in drift:
+            self.stdout.write(f"  {collection}.{name}: {problem}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("All indexes match the registry"))
+        elif options["check"]:
+            raise CommandError(f"{len(drift)} index(es) drifted from the registry")
+        else:
+            self.stdout.write(self.style.SUCCESS("Missing indexes created"))
@@ -0,0 +1,83 @@
+"""
+Fill MongoDB with a large, reproducible synthetic data set (see booking/datagen.py).
+
+    python manage.py generate_data                                  # ~12k showtimes, 3.6M seats
+    python manage.py generate_data --venues 100 --screens 12 --days 60 --seats-per-screen 350
+    python manage.py generate_data --drop --seed 7 --payment-curve onsale
+
+The same options and seed always produce the same documents, so an interrupted
+run can simply be started again. Load first, then run `ensure_indexes` and
+`rebuild_rollups`: building indexes once is faster than maintaining them per insert.
+"""
+
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.datagen import GENERATED_COLLECTIONS, PAYMENT_CURVES, GeneratorConfig, default_start, generate
+from booking.mongo_db import db
+
+
+class Command(BaseCommand):
+    help = "Generate venues, showtimes and bookings at capacity-planning scale."
+
+    def add_arguments(self, parser):
+        defaults = GeneratorConfig()
+        parser.add_argument("--venues", type=int, default=defaults.venues)
+        parser.add_argument("--screens", type=int, default=defaults.screens, help="Screens per venue.")
+        parser.add_argument("--seats-per-screen", type=int, default=defaults.seats_per_screen)
+        parser.add_argument("--shows-per-day", type=int, default=defaults.shows_per_day, help="Showtimes per screen per day.")
+        parser.add_argument("--days", type=int, default=defaults.days)
+        parser.add_argument("--start", help="First show day, YYYY-MM-DD (default: --days days ago, so every sale is in the past).")
+        parser.add_argument("--movies", type=int, default=defaults.movies)
+        parser.add_argument("--users", type=int, default=defaults.users)
+        parser.add_argument("--density", type=float, default=defaults.density, help="Average share of seats sold, 0-1.")
+        parser.add_argument("--payment-curve", choices=sorted(PAYMENT_CURVES), default=defaults.payment_curve)
+        parser.add_argument("--seed", type=int, default=defaults.seed)
+        parser.add_argument("--batch-size", type=int, default=defaults.batch_size, help="Documents per insert_many.")
+        parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU).")
+        parser.add_argument("--drop", action="store_true", help="Drop the generated collections first.")
+
+    def handle(self, *args, **options):
+        if not 0 <= options["density"] <= 1:
+            raise CommandError("--density must be between 0 and 1")
+        try:
+            start = datetime.strptime(options["start"], "%Y-%m-%d") if options["start"] else None
+        except ValueError:
+            raise CommandError("--start must be YYYY-MM-DD")
+
+        config = GeneratorConfig(
+            venues=options["venues"],
+            screens=options["screens"],
+            seats_per_screen=options["seats_per_screen"],
+            shows_per_day=options["shows_per_day"],
+            days=options["days"],
+            start=start or default_start(options["days"]),
+            movies=options["movies"],
+            users=options["users"],
+            density=options["density"],
+            payment_curve=options["payment_curve"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+        )
+
+        if options["drop"]:
+            for collection in GENERATED_COLLECTIONS:
+                db.drop_collection(collection)
+            self.stdout.write(f"Dropped {', '.join(GENERATED_COLLECTIONS)}")
+
+        def progress(done, total):
+            if done % max(total // 20, 1) == 0 or done == total:
+                self.stdout.write(f"  {done}/{total} venue-days")
+
+        started = time.monotonic()
+        counts = generate(config, workers=options["workers"], progress=progress)
+        elapsed = time.monotonic() - started
+
+        for name, count in counts.items():
+            self.stdout.write(f"  {name}: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated in {elapsed:.1f}s ({counts['seats'] / max(elapsed, 0.001):,.0f} seats/s). "
+            "Now run `ensure_indexes` and `rebuild_rollups`."
+        ))
@@ -0,0 +1,80 @@
+"""
+Hammer /api/reserve/ like a blockbuster on-sale and verify nothing was double-sold
+(see booking/loadtest.py).
+
+    python manage.py load_test_onsale                                # 5000 requests, 50 at a time, fresh 300-seat showtime
+    python manage.py load_test_onsale --requests 20000 --concurrency 200 --seats 500
+    python manage.py load_test_onsale --showtime 612345abcdef678901234570 --keep
+
+Runs in-process against the configured MongoDB; nothing else needs to be up.
+Exits with status 1 if verification finds a problem.
+"""
+
+import json
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.datagen import seat_labels
+from booking.loadtest import cleanup, create_showtime, plan_requests, run_load, snapshot, verify_showtime
+from booking.mongo_db import db
+
+
+class Command(BaseCommand):
+    help = "On-sale contention load test for reserve_seat_api, with a no-double-sell check afterwards."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=5000)
+        parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight at once (threads).")
+        parser.add_argument("--seats", type=int, default=300, help="Seats of the showtime created for the run.")
+        parser.add_argument("--showtime", help="Use this existing showtime instead of creating one.")
+        parser.add_argument("--max-group", type=int, default=4, help="Most seats one request asks for.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--keep", action="store_true", help="Keep the created showtime and its bookings.")
+        parser.add_argument("--output", help="Also write the result as JSON to this file.")
+
+    def handle(self, *args, **options):
+        if options["showtime"]:
+            showtime_id = ObjectId(options["showtime"])
+            showtime = db.showtimes.find_one({"_id": showtime_id}, {"seats.seat": 1, "seats.status": 1})
+            if not showtime:
+                raise CommandError(f"Showtime {showtime_id} not found")
+            # Aim at the seats still on sale; the ones sold before the run aren't part of the test
+            labels = [s["seat"] for s in showtime["seats"] if s["status"] == "available"]
+            if not labels:
+                raise CommandError(f"Showtime {showtime_id} has no seats left on sale")
+        else:
+            showtime_id = create_showtime(options["seats"])
+            labels = seat_labels(options["seats"])
+
+        before = snapshot(showtime_id)
+        plan = plan_requests(labels, options["requests"], options["seed"], max_group=options["max_group"])
+        self.stdout.write(
+            f"Firing {len(plan)} reservations at showtime {showtime_id}, {options['concurrency']} at a time..."
+        )
+        result = run_load(showtime_id, plan, concurrency=options["concurrency"])
+        problems = verify_showtime(showtime_id, result["booking_ids"], before)
+
+        latency = result["latency"]
+        self.stdout.write(
+            f"  accepted {result['accepted']}, conflicts {result['conflicts']}, errors {result['errors']}"
+            f" in {result['wall_seconds']}s\n"
+            f"  {result['accepted_per_second']} accepted/s, {result['requests_per_second']} requests/s,"
+            f" conflict rate {result['conflict_rate']:.1%}\n"
+            f"  latency p50 {latency['p50_ms']} ms, p95 {latency['p95_ms']} ms, p99 {latency['p99_ms']} ms"
+        )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump({**result, "showtime_id": str(showtime_id), "problems": problems}, f, indent=2)
+
+        if not options["showtime"] and not options["keep"]:
+            cleanup(showtime_id)
+
+        if problems:
+            for problem in problems:
+                self.stdout.write(f"  {problem}")
+            raise CommandError(f"{len(problems)} problem(s) after the load run")
+        if result["errors"]:
+            raise CommandError(f"{result['errors']} request(s) failed with an unexpected status")
+        self.stdout.write(self.style.SUCCESS("No seat sold twice; bookings and seat map agree"))
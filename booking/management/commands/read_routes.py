@@ -0,0 +1,58 @@
+"""
+Show where each read route (settings.MONGODB_READ_ROUTES) actually sends its queries.
+
+    python manage.py read_routes
+
+Runs one small query per route and reports the read preference and the server
+that answered it. Against a local replica set, e.g.
+
+    mongod --replSet rs0 --port 27017 ...   (x3, then rs.initiate())
+    MONGODB_URI="mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0"
+
+seats should land on the primary, and catalog/analytics on a secondary. It
+exits with status 1 if the seats route ever leaves the primary, or if a
+secondary-preferring route hits the primary while a secondary is up.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.mongo_db import analytics_db, catalog_db, command_counter, db, get_client
+
+ROUTES = {
+    "seats": db,
+    "catalog": catalog_db,
+    "analytics": analytics_db,
+}
+
+
+class Command(BaseCommand):
+    help = "Report which MongoDB server each read route is served by."
+
+    def handle(self, *args, **options):
+        client = get_client()
+        problems = []
+        for route, database in ROUTES.items():
+            preference = database.read_preference
+            before = command_counter.count
+            database.showtimes.find_one({}, {"_id": 1})
+            address = command_counter.last_address
+            # Nothing seen (or only an earlier route's command): don't guess the server
+            if address is None or command_counter.count == before:
+                raise CommandError(
+                    f"No MongoDB command was recorded for the {route} route, so its server is unknown. "
+                    "Is command_counter registered on the client (booking/mongo_db.py)?"
+                )
+
+            # Sampled after the query, once server discovery has happened
+            primary, secondaries = client.primary, client.secondaries
+            role = "primary" if address == primary else "secondary" if address in secondaries else "standalone"
+            self.stdout.write(f"  {route:<10} {preference.mongos_mode:<20} -> {address[0]}:{address[1]} ({role})")
+
+            if route == "seats" and role == "secondary":
+                problems.append("seats read from a secondary")
+            if preference.mongos_mode in ("secondary", "secondaryPreferred") and role == "primary" and secondaries:
+                problems.append(f"{route} read from the primary although a secondary is available")
+
+        if problems:
+            raise CommandError("; ".join(problems))
+        self.stdout.write(self.style.SUCCESS("Read routing as configured"))
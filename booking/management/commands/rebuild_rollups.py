@@ -0,0 +1,21 @@
+"""
+Recompute the dashboard's sales rollups from the bookings collection.
+
+    python manage.py rebuild_rollups
+
+Payments confirmed while this runs may be counted twice or not at all, so run
+it when checkout is quiet.
+"""
+
+from django.core.management.base import BaseCommand
+
+from booking.analytics import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild rollup_movies, rollup_venues and rollup_daily from confirmed bookings."
+
+    def handle(self, *args, **options):
+        for collection, count in rebuild_rollups().items():
+            self.stdout.write(f"  {collection}: {count} document(s)")
+        self.stdout.write(self.style.SUCCESS("Rollups rebuilt"))
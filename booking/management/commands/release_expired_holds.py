@@ -0,0 +1,41 @@
+"""
+Release seat holds whose lease ran out.
+
+Run once (e.g. from cron):
+    python manage.py release_expired_holds
+
+Or keep it running as a background reaper:
+    python manage.py release_expired_holds --every 30
+
+The web processes already run the same sweep on a thread (see
+settings.SEAT_HOLD_REAPER_SECONDS); set that to 0 when using this instead.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking.seats import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Release expired seat holds and drop their unpaid bookings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--every", type=int, default=0,
+            help="Keep running and sweep every N seconds (default: sweep once and exit).",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=500,
+            help="How many expired bookings to release per bulk write.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired_holds(batch_size=options["batch_size"])
+            if released or not options["every"]:
+                self.stdout.write(f"Released {released} expired hold(s)")
+            if not options["every"]:
+                return
+            time.sleep(options["every"])
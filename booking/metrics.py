@@ -0,0 +1,279 @@
+"""
+In-process metrics, served at /metrics in the Prometheus text format.
+
+    from .metrics import PAYMENT_CONFIRMATIONS
+    PAYMENT_CONFIRMATIONS.inc(outcome="confirmed")
+
+What is collected:
+- http_request_duration_seconds: latency histogram per view, method and status
+  class (MetricsMiddleware)
+- mongo_pool_checkout_wait_seconds: how long each thread waited for a pooled
+  connection, and mongo_pool_checkout_failures_total when it gave up
+  (PoolMetrics, registered on every client in mongo_db.py)
+- mongo_pool_connections_in_use / mongo_pool_connections_open
+- seat_reservation_conflicts_total: reservations refused because a seat was
+  already taken (seats.py)
+- seat_hold_expirations_total: holds that ran out and were released by the reaper
+- payment_confirmations_total: payments by outcome, "confirmed" or
+  "hold_expired" (the customer paid too late)
+- log_records_dropped_total: records the logging queue had no room for (logs.py)
+
+Every process keeps its own numbers, like any Prometheus client: scrape each
+worker, or sum over them. By default each web process runs its own hold
+reaper thread (settings.SEAT_HOLD_REAPER_SECONDS), so seat_hold_expirations_total
+is spread over the workers like everything else. With SEAT_HOLD_REAPER_SECONDS=0
+and `manage.py release_expired_holds --every 30` as a separate process instead,
+its releases don't show up on any web process's /metrics.
+
+settings.METRICS_TOKEN, when set, must be sent as `Authorization: Bearer <token>`.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from pymongo import monitoring
+
+# Prometheus client defaults, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+# A healthy pool hands out a connection in microseconds; waits of a millisecond and up mean it's exhausted
+CHECKOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class: a named family of samples keyed by label values."""
+
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items):
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def _render_samples(self, items):
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, [("le", _format_value(bound))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+REGISTRY = []
+
+
+def render():
+    """Every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ------------------------
+# METRICS
+# ------------------------
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time spent handling a request, by view.",
+    labels=("view", "method", "status"),
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting to check a connection out of the MongoDB pool.",
+    labels=("address",), buckets=CHECKOUT_BUCKETS,
+)
+POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total", "MongoDB connection checkouts that failed (timeout, pool closed...).",
+    labels=("address", "reason"),
+)
+POOL_IN_USE = Gauge(
+    "mongo_pool_connections_in_use", "MongoDB connections currently checked out.", labels=("address",),
+)
+POOL_OPEN = Gauge(
+    "mongo_pool_connections_open", "MongoDB connections currently open.", labels=("address",),
+)
+RESERVATION_CONFLICTS = Counter(
+    "seat_reservation_conflicts_total", "Reservations refused because a requested seat was already taken.",
+    labels=("reason",),
+)
+HOLD_EXPIRATIONS = Counter(
+    "seat_hold_expirations_total", "Unpaid bookings whose seat hold ran out and was released.",
+)
+PAYMENT_CONFIRMATIONS = Counter(
+    "payment_confirmations_total", "Payments submitted, by outcome (confirmed, hold_expired).",
+    labels=("outcome",),
+)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total", "Log records dropped because the logging queue was full (booking/logs.py).",
+)
+
+
+# ------------------------
+# MONGODB POOL
+# ------------------------
+
+def _address(event):
+    host, port = event.address
+    return f"{host}:{port}"
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Feeds the mongo_pool_* metrics from pymongo's connection pool events."""
+
+    def connection_checked_out(self, event):
+        address = _address(event)
+        POOL_CHECKOUT_WAIT.observe(event.duration or 0.0, address=address)
+        POOL_IN_USE.inc(address=address)
+
+    def connection_check_out_failed(self, event):
+        address = _address(event)
+        POOL_CHECKOUT_WAIT.observe(event.duration or 0.0, address=address)
+        POOL_CHECKOUT_FAILURES.inc(address=address, reason=event.reason)
+
+    def connection_checked_in(self, event):
+        POOL_IN_USE.dec(address=_address(event))
+
+    def connection_created(self, event):
+        POOL_OPEN.inc(address=_address(event))
+
+    def connection_closed(self, event):
+        POOL_OPEN.dec(address=_address(event))
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+
+pool_metrics = PoolMetrics()
+
+
+# ------------------------
+# MIDDLEWARE
+# ------------------------
+
+class MetricsMiddleware:
+    """Times every request into http_request_duration_seconds (sync and async)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._observe(request, response, started)
+        return response
+
+    async def _acall(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, response, started)
+        return response
+
+    def _observe(self, request, response, started):
+        match = request.resolver_match
+        # Unresolved paths (404s) share one label value so scanners can't blow up the series count
+        view = match.view_name if match else "unresolved"
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - started,
+            view=view, method=request.method, status=f"{response.status_code // 100}xx",
+        )
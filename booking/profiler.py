@@ -0,0 +1,221 @@
+"""
+Per-request MongoDB command profiler.
+
+A pymongo CommandListener (registered on every client in mongo_db.py) records
+each command issued while a request is being handled: command name,
+collection, duration, and its *shape*, the filter or pipeline with every
+value replaced by "?". So `find movies {"_id": "?"}` is the same shape
+whichever movie it looks up.
+
+A shape that repeats N_PLUS_ONE_THRESHOLD times or more in one request is
+flagged as a likely N+1 (one query per item of a list instead of one $in).
+
+MongoProfilerMiddleware ties it to the request cycle:
+- with DEBUG on, responses carry X-Mongo-Commands, X-Mongo-Time-Ms and
+  X-Mongo-N-Plus-One headers
+- every request is added to a rolling in-process summary, served to staff at
+  /admin-dashboard/mongo-profile/ (views.mongo_profile_view)
+
+settings.MONGO_PROFILER switches it off entirely (default: on).
+"""
+
+import json
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from pymongo import monitoring
+
+N_PLUS_ONE_THRESHOLD = 3
+HISTORY_SIZE = 200
+
+# Where each command keeps the part worth profiling
+FILTER_FIELDS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+    "aggregate": "pipeline",
+}
+IGNORED_COMMANDS = {"endSessions", "killCursors", "hello", "isMaster", "ismaster", "ping"}
+
+_current = ContextVar("mongo_request_profile", default=None)
+
+
+def shape(value):
+    """The structure of a filter or pipeline with every value replaced by '?'."""
+    if isinstance(value, dict):
+        return {key: shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [shape(item) for item in value]
+        # A list of plain values ($in, $nin...) is one placeholder, however long; pipelines keep every stage
+        if all(item == "?" for item in items):
+            return ["?"]
+        return items
+    return "?"
+
+
+def command_shape(name, command):
+    """'find movies {"_id": "?"}' for a find_one by _id on movies."""
+    if name in FILTER_FIELDS:
+        detail = command.get(FILTER_FIELDS[name], {})
+    elif name in ("update", "delete"):
+        statements = command.get(name + "s") or [{}]
+        detail = statements[0].get("q", {})
+    else:
+        detail = {}
+    collection = command.get(name)
+    parts = [name, collection if isinstance(collection, str) else None, json.dumps(shape(detail), sort_keys=True)]
+    return " ".join(part for part in parts if part)
+
+
+class RequestProfile:
+    """Commands one request issued."""
+
+    def __init__(self):
+        self.commands = []      # [(shape, duration_ms, ok)]
+        self._pending = {}
+
+    @property
+    def total_ms(self):
+        return sum(duration for _, duration, _ in self.commands)
+
+    def n_plus_one(self):
+        """{shape: count} for every shape repeated N_PLUS_ONE_THRESHOLD times or more."""
+        counts = Counter(command for command, _, _ in self.commands)
+        return {command: count for command, count in counts.items() if count >= N_PLUS_ONE_THRESHOLD}
+
+
+class CommandProfiler(monitoring.CommandListener):
+    """Records commands into the RequestProfile of the request (thread or task) issuing them."""
+
+    def started(self, event):
+        profile = _current.get()
+        if profile is not None and event.command_name not in IGNORED_COMMANDS:
+            profile._pending[event.request_id] = command_shape(event.command_name, event.command)
+
+    def succeeded(self, event):
+        self._finish(event, ok=True)
+
+    def failed(self, event):
+        self._finish(event, ok=False)
+
+    def _finish(self, event, ok):
+        profile = _current.get()
+        if profile is not None:
+            command = profile._pending.pop(event.request_id, None)
+            if command:
+                profile.commands.append((command, event.duration_micros / 1000, ok))
+
+
+command_profiler = CommandProfiler()
+
+
+# ------------------------
+# ROLLING SUMMARY
+# ------------------------
+
+_lock = threading.Lock()
+_recent = deque(maxlen=HISTORY_SIZE)
+_by_view = {}
+
+
+def record(view, path, profile, elapsed_ms):
+    n_plus_one = profile.n_plus_one()
+    entry = {
+        "at": time.time(),
+        "view": view,
+        "path": path,
+        "commands": len(profile.commands),
+        "mongo_ms": round(profile.total_ms, 2),
+        "request_ms": round(elapsed_ms, 2),
+        "n_plus_one": n_plus_one,
+    }
+    with _lock:
+        _recent.append(entry)
+        stats = _by_view.setdefault(view, {
+            "requests": 0, "commands": 0, "mongo_ms": 0.0, "n_plus_one_requests": 0, "shapes": Counter(),
+        })
+        stats["requests"] += 1
+        stats["commands"] += len(profile.commands)
+        stats["mongo_ms"] += profile.total_ms
+        stats["n_plus_one_requests"] += bool(n_plus_one)
+        stats["shapes"].update(command for command, _, _ in profile.commands)
+    return entry
+
+
+def summary(recent=50, top_shapes=10):
+    """Per-view totals and the most recent requests, as plain JSON-able dicts."""
+    with _lock:
+        views = {
+            view: {
+                "requests": stats["requests"],
+                "avg_commands": round(stats["commands"] / stats["requests"], 2),
+                "avg_mongo_ms": round(stats["mongo_ms"] / stats["requests"], 2),
+                "n_plus_one_requests": stats["n_plus_one_requests"],
+                "top_shapes": stats["shapes"].most_common(top_shapes),
+            }
+            for view, stats in _by_view.items()
+        }
+        return {"views": views, "recent": list(_recent)[-recent:]}
+
+
+# ------------------------
+# MIDDLEWARE
+# ------------------------
+
+class MongoProfilerMiddleware:
+    """Profiles the MongoDB commands of every request (see the module docstring)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "MONGO_PROFILER", True)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        if not self.enabled:
+            return self.get_response(request)
+        profile, token, started = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, profile, started)
+
+    async def _acall(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        profile, token, started = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, profile, started)
+
+    def _start(self):
+        profile = RequestProfile()
+        return profile, _current.set(profile), time.perf_counter()
+
+    def _finish(self, request, response, profile, started):
+        match = request.resolver_match
+        # Unresolved paths (404s) share one bucket so they can't grow the summary without bound
+        view = match.view_name if match else "unresolved"
+        entry = record(view, request.path, profile, (time.perf_counter() - started) * 1000)
+
+        if settings.DEBUG:
+            response["X-Mongo-Commands"] = str(entry["commands"])
+            response["X-Mongo-Time-Ms"] = str(entry["mongo_ms"])
+            if entry["n_plus_one"]:
+                response["X-Mongo-N-Plus-One"] = "; ".join(
+                    f"{count}x {command}" for command, count in entry["n_plus_one"].items()
+                )[:1000]
+        return response
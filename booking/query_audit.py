@@ -0,0 +1,364 @@
+"""
+Query-plan audit: explain() every query shape the app and the consistency
+checks run, and flag the ones that don't use an index properly.
+
+Each entry in QUERIES names where the query lives and builds it from sample
+documents of the seeded database (a real showtime, booking, user...), so
+filters match actual data. audit() runs each one with
+explain(verbosity="executionStats") and reports:
+
+    {"name", "source", "collection", "plan", "collscan", "full_scan", "keys_examined",
+     "docs_examined", "returned", "ratio", "problems"}
+
+`plan` is the winning plan's stages from the root down, e.g.
+"FETCH > IXSCAN(showtime)". `ratio` is max(keys, docs examined) per document
+returned, with 0 returned counted as 1. A query fails on a COLLSCAN or a
+ratio above `max_ratio`.
+
+A few queries read a whole collection on purpose (the movie list, the full
+consistency scan...). They carry a `full_scan` reason and don't fail on their
+COLLSCAN unless `strict` is set.
+
+When you add a query to views.py or consistency.py, add its shape here too
+(and its index to indexes.py).
+"""
+
+from datetime import datetime, timedelta
+
+from .consistency import BOOKING_FIELDS, SEAT_FIELDS
+from .live import SEAT_EVENT_FIELDS
+
+DEFAULT_MAX_RATIO = 10
+
+
+def _seats(sample, count=2):
+    return [seat["seat"] for seat in sample["showtime"]["seats"][:count]]
+
+
+def _pending_or_any(sample):
+    return sample["pending_booking"] or sample["booking"]
+
+
+# Every entry: name, source, collection, and a `command` built from the samples
+# ({"find": filter, ...}, {"aggregate": pipeline} or {"distinct": key, "query": filter}).
+QUERIES = [
+    # ---- views.py / async_views.py / caching.py ----
+    {
+        "name": "movie list",
+        "source": "views.movies_view",
+        "collection": "movies",
+        "command": lambda s: {"find": {}},
+        "full_scan": "lists every movie (cached for a minute)",
+    },
+    {
+        "name": "showtime list",
+        "source": "views.movies_view",
+        "collection": "showtimes",
+        "command": lambda s: {"find": {}, "projection": {"seats": 0}},
+        "full_scan": "lists every showtime",
+    },
+    {
+        "name": "venues of the listed showtimes",
+        "source": "views.movies_view",
+        "collection": "venues",
+        "command": lambda s: {"find": {"_id": {"$in": [s["showtime"]["venue_id"]]}}},
+    },
+    {
+        "name": "movie by id",
+        "source": "caching.get_movie",
+        "collection": "movies",
+        "command": lambda s: {"find": {"_id": s["showtime"]["movie_id"]}, "limit": 1},
+    },
+    {
+        "name": "venue by id",
+        "source": "caching.get_venue",
+        "collection": "venues",
+        "command": lambda s: {"find": {"_id": s["showtime"]["venue_id"]}, "limit": 1},
+    },
+    {
+        "name": "showtime by id",
+        "source": "views.reserve_view, views.payment_view, views.confirm_view",
+        "collection": "showtimes",
+        "command": lambda s: {"find": {"_id": s["showtime"]["_id"]}, "projection": {"seats": 0}, "limit": 1},
+    },
+    {
+        "name": "seat version",
+        "source": "views.seat_availability_api (ETag), seats.seat_version",
+        "collection": "showtimes",
+        "command": lambda s: {"find": {"_id": s["showtime"]["_id"]}, "projection": {"seat_version": 1}, "limit": 1},
+    },
+    {
+        "name": "compact seat map",
+        "source": "views.seat_map_compact_api, views.seat_events_stream",
+        "collection": "showtimes",
+        "command": lambda s: {"find": {"_id": s["showtime"]["_id"]}, "projection": SEAT_EVENT_FIELDS, "limit": 1},
+    },
+    {
+        "name": "reserve seats (update filter)",
+        "source": "views.reserve_seat_api -> seats.reserve_seats",
+        "collection": "showtimes",
+        "command": lambda s: {"find": {
+            "_id": s["showtime"]["_id"],
+            "seats": {"$all": [{"$elemMatch": {"seat": seat, "status": "available"}} for seat in _seats(s)]},
+        }, "limit": 1},
+    },
+    {
+        "name": "confirm seats (update filter)",
+        "source": "views.payment_view -> seats.confirm_seats",
+        "collection": "showtimes",
+        "command": lambda s: {"find": {
+            "_id": s["showtime"]["_id"],
+            "seats": {"$all": [
+                {"$elemMatch": {
+                    "seat": seat, "status": "held", "booking_id": _pending_or_any(s)["_id"],
+                    "hold_expires_at": {"$gt": datetime.now()},
+                }}
+                for seat in _seats(s)
+            ]},
+        }, "limit": 1},
+    },
+    {
+        # _id decides; user_id / showtime_id / booking_confirmed only guard it
+        "name": "pending booking of a user",
+        "source": "views.payment_view",
+        "collection": "bookings",
+        "command": lambda s: {"find": {
+            "_id": _pending_or_any(s)["_id"],
+            "user_id": _pending_or_any(s).get("user_id"),
+            "showtime_id": _pending_or_any(s).get("showtime_id"),
+            "booking_confirmed": False,
+        }, "limit": 1},
+    },
+    {
+        "name": "booking by id",
+        "source": "views.confirm_view",
+        "collection": "bookings",
+        "command": lambda s: {"find": {"_id": s["booking"]["_id"]}, "limit": 1},
+    },
+    {
+        "name": "expired holds",
+        "source": "seats.release_expired_holds",
+        "collection": "bookings",
+        "command": lambda s: {
+            "find": {"booking_confirmed": False, "hold_expires_at": {"$lte": datetime.now()}},
+            "projection": {"showtime_id": 1, "seats": 1},
+            "limit": 500,
+        },
+    },
+    {
+        "name": "ranged dashboard revenue",
+        "source": "views.analytics_data -> analytics.ranged_dashboard_data",
+        "collection": "bookings",
+        "command": lambda s: {"aggregate": [
+            {"$match": {
+                "payment.paid_at": {"$gte": datetime.now() - timedelta(days=7), "$lt": datetime.now()},
+                "booking_confirmed": True,
+            }},
+            {"$group": {"_id": "$movie_id", "total_revenue": {"$sum": "$total_price"}}},
+        ]},
+    },
+    {
+        "name": "dashboard movie rollup",
+        "source": "views.analytics_data -> analytics.dashboard_data",
+        "collection": "rollup_movies",
+        "command": lambda s: {"find": {"title": {"$ne": None}}},
+        "full_scan": "one small document per movie",
+    },
+    {
+        "name": "dashboard venue rollup",
+        "source": "views.analytics_data -> analytics.dashboard_data",
+        "collection": "rollup_venues",
+        "command": lambda s: {"find": {"name": {"$ne": None}}},
+        "full_scan": "one small document per venue",
+    },
+    {
+        "name": "dashboard daily rollup",
+        "source": "views.analytics_data -> analytics.dashboard_data",
+        "collection": "rollup_daily",
+        "command": lambda s: {"find": {}, "sort": {"_id": 1}},
+    },
+
+    # ---- validate.py -> consistency.py ----
+    {
+        "name": "showtimes in _id order",
+        "source": "consistency.check_showtimes",
+        "collection": "showtimes",
+        "command": lambda s: {"find": {}, "projection": SEAT_FIELDS, "sort": {"_id": 1}},
+    },
+    {
+        "name": "bookings of a showtime chunk",
+        "source": "consistency._check_chunk",
+        "collection": "bookings",
+        "command": lambda s: {"find": {"showtime_id": {"$in": [s["showtime"]["_id"]]}}, "projection": BOOKING_FIELDS},
+    },
+    {
+        "name": "legacy bookings without showtime_id",
+        "source": "consistency._legacy_bookings",
+        "collection": "bookings",
+        "command": lambda s: {"find": {"showtime_id": {"$exists": False}}},
+    },
+    {
+        "name": "legacy bookings of changed movies",
+        "source": "consistency._legacy_bookings (incremental)",
+        "collection": "bookings",
+        "command": lambda s: {"find": {
+            "showtime_id": {"$exists": False},
+            "movie_id": {"$in": [s["showtime"]["movie_id"]]},
+        }},
+    },
+    {
+        "name": "showtime by movie, venue and schedule",
+        "source": "consistency._legacy_bookings",
+        "collection": "showtimes",
+        "command": lambda s: {"find": {"$or": [{
+            "movie_id": s["showtime"]["movie_id"],
+            "venue_id": s["showtime"]["venue_id"],
+            "schedule": s["showtime"].get("schedule"),
+        }]}, "projection": {"movie_id": 1, "venue_id": 1, "schedule": 1}},
+    },
+    {
+        "name": "distinct booked showtimes",
+        "source": "consistency.check_booking_references",
+        "collection": "bookings",
+        "command": lambda s: {"distinct": "showtime_id", "query": {}},
+    },
+    {
+        "name": "showtimes by id batch",
+        "source": "consistency.check_booking_references",
+        "collection": "showtimes",
+        "command": lambda s: {"find": {"_id": {"$in": [s["showtime"]["_id"]]}}, "projection": {"_id": 1}},
+    },
+    {
+        "name": "distinct booking users",
+        "source": "consistency.check_booking_references",
+        "collection": "bookings",
+        "command": lambda s: {"aggregate": [{"$match": {}}, {"$group": {"_id": "$user_id"}}]},
+        "full_scan": "the full check groups every booking by user",
+    },
+    {
+        "name": "users by id batch",
+        "source": "consistency.check_booking_references",
+        "collection": "users",
+        "command": lambda s: {"find": {"_id": {"$in": [s["user"]["_id"]]}}, "projection": {"_id": 1}},
+    },
+    {
+        # user index; only runs for the few user_ids that didn't resolve
+        "name": "bookings of missing users",
+        "source": "consistency.check_booking_references",
+        "collection": "bookings",
+        "command": lambda s: {"find": {"user_id": {"$in": [s["booking"].get("user_id")]}}, "projection": {"user_id": 1}},
+    },
+    {
+        "name": "showtimes changed since the watermark",
+        "source": "consistency.incremental_report",
+        "collection": "showtimes",
+        "command": lambda s: {"find": {"updated_at": {"$gte": datetime.now() - timedelta(hours=1)}}, "projection": {"_id": 1}},
+    },
+    {
+        "name": "bookings changed since the watermark",
+        "source": "consistency.incremental_report",
+        "collection": "bookings",
+        "command": lambda s: {"distinct": "showtime_id", "query": {"updated_at": {"$gte": datetime.now() - timedelta(hours=1)}}},
+    },
+]
+
+
+def load_samples(db):
+    """One real document per collection the queries are built from. Raises LookupError on an empty database."""
+    samples = {
+        "showtime": db.showtimes.find_one({"seats.1": {"$exists": True}}),
+        "booking": db.bookings.find_one({"showtime_id": {"$exists": True}}),
+        "pending_booking": db.bookings.find_one({"booking_confirmed": False, "showtime_id": {"$exists": True}}),
+        "user": db.users.find_one({}, {"_id": 1}),
+    }
+    empty = [name for name in ("showtime", "booking", "user") if samples[name] is None]
+    if empty:
+        raise LookupError(f"No {', '.join(empty)} to build queries from; seed the database first (generate_data)")
+    return samples
+
+
+def _explain_command(collection, command):
+    if "find" in command:
+        explained = {"find": collection, "filter": command["find"]}
+        for option in ("projection", "sort", "limit"):
+            if option in command:
+                explained[option] = command[option]
+        return explained
+    if "aggregate" in command:
+        return {"aggregate": collection, "pipeline": command["aggregate"], "cursor": {}}
+    return {"distinct": collection, "key": command["distinct"], "query": command["query"]}
+
+
+def _planner_and_stats(explain):
+    # Queries answered by the find layer report at the top; aggregations with
+    # later stages nest them under their first ($cursor) stage
+    if "executionStats" in explain:
+        return explain["queryPlanner"], explain["executionStats"]
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            return stage["$cursor"]["queryPlanner"], stage["$cursor"]["executionStats"]
+    for shard in (explain.get("shards") or {}).values():
+        return _planner_and_stats(shard)
+    raise ValueError("explain output has no execution stats")
+
+
+def plan_stages(plan):
+    """'FETCH > IXSCAN(index)' for a winning plan (classic or slot-based engine)."""
+    plan = plan.get("queryPlan", plan)  # SBE nests the classic-looking tree under queryPlan
+    stages = []
+    while plan:
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage += f"({plan['indexName']})"
+        stages.append(stage)
+        children = plan.get("inputStages") or ([plan["inputStage"]] if "inputStage" in plan else [])
+        if len(children) > 1:
+            stages.append("[" + " | ".join(plan_stages(child) for child in children) + "]")
+            break
+        plan = children[0] if children else None
+    return " > ".join(stages)
+
+
+def explain_query(db, query, samples, max_ratio=DEFAULT_MAX_RATIO, strict=False):
+    """Explain one QUERIES entry. Returns its result dict."""
+    command = _explain_command(query["collection"], query["command"](samples))
+    explain = db.command("explain", command, verbosity="executionStats")
+    planner, stats = _planner_and_stats(explain)
+
+    plan = plan_stages(planner["winningPlan"])
+    keys = stats.get("totalKeysExamined", 0)
+    docs = stats.get("totalDocsExamined", 0)
+    returned = stats.get("nReturned", 0)
+    ratio = round(max(keys, docs) / max(returned, 1), 2)
+    collscan = "COLLSCAN" in plan
+
+    problems = []
+    if collscan and (strict or not query.get("full_scan")):
+        problems.append("COLLSCAN")
+    # A deliberate full scan examines everything by definition
+    if ratio > max_ratio and not (collscan and query.get("full_scan") and not strict):
+        problems.append(f"examined/returned {ratio} > {max_ratio}")
+
+    return {
+        "name": query["name"],
+        "source": query["source"],
+        "collection": query["collection"],
+        "plan": plan,
+        "collscan": collscan,
+        "full_scan": query.get("full_scan"),
+        "keys_examined": keys,
+        "docs_examined": docs,
+        "returned": returned,
+        "ratio": ratio,
+        "problems": problems,
+    }
+
+
+def audit(db, max_ratio=DEFAULT_MAX_RATIO, strict=False, names=None):
+    """Explain every query in QUERIES (or just those in `names`). Returns the list of result dicts."""
+    samples = load_samples(db)
+    return [
+        explain_query(db, query, samples, max_ratio=max_ratio, strict=strict)
+        for query in QUERIES
+        if not names or query["name"] in names
+    ]
@@ -0,0 +1,205 @@
+"""
+Opt-in cProfile of live requests, to see where the Python time of a slow view goes.
+
+A request is profiled when:
+- a staff user sends the `X-Profile: 1` header or the `?_profile=1` query
+  parameter, or
+- it falls in the random sample, settings.PROFILER_SAMPLE_RATE (default 0:
+  only on request).
+
+Each profile is saved as a pstats file under
+settings.PROFILER_DIR/<view name>/<timestamp>-<ms>ms-<request id>.prof. Only
+the newest PROFILER_KEEP are kept per view. The response names the file in
+an X-Profile-Id header. Staff can list the profiles at /admin-dashboard/profiles/
+and download them (open with `python -m pstats` or snakeviz), or read their
+top functions as text.
+
+Under an ASGI server the request is profiled on two threads, merged into one
+file: the event loop (async middleware and views) and the request's
+sync_to_async thread (sync views and middleware). Async views share the loop
+with every other request, so their profile also shows what ran on the loop
+while they awaited.
+"""
+
+import cProfile
+import io
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_PARAM = "_profile"
+PROFILE_SUFFIX = ".prof"
+
+# <timestamp>-<ms>ms-<id>.prof
+PROFILE_NAME = re.compile(r"^(\d{8}T\d{6})-(\d+)ms-([0-9a-fA-F-]+)\.prof$")
+
+
+def profile_dir():
+    return Path(getattr(settings, "PROFILER_DIR", settings.BASE_DIR / "profiles"))
+
+
+def _endpoint_dir_name(view):
+    # "booking.views.reserve_seat_api" / "movies" -> a safe directory name
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", view)
+    # "", "." and ".." would point at the profile directory or its parent
+    return name if name.strip(".") else "_"
+
+
+def save_profile(profilers, view, elapsed_ms, request_id=None):
+    """Dump finished profilers, merged, for `view` and prune old ones. Returns (endpoint, file name)."""
+    endpoint = _endpoint_dir_name(view)
+    directory = profile_dir() / endpoint
+    directory.mkdir(parents=True, exist_ok=True)
+
+    name = f"{datetime.now():%Y%m%dT%H%M%S}-{round(elapsed_ms)}ms-{request_id or uuid.uuid4().hex}{PROFILE_SUFFIX}"
+    # pstats refuses a profiler that recorded nothing
+    pstats.Stats(*[profiler for profiler in profilers if profiler.getstats()]).dump_stats(directory / name)
+
+    keep = getattr(settings, "PROFILER_KEEP", 20)
+    for old in sorted(directory.glob("*" + PROFILE_SUFFIX), reverse=True)[keep:]:
+        old.unlink(missing_ok=True)
+    return endpoint, name
+
+
+def list_profiles():
+    """[{"endpoint", "name", "taken_at", "elapsed_ms", "size"}], newest first."""
+    profiles = []
+    root = profile_dir()
+    if not root.is_dir():
+        return profiles
+    for directory in root.iterdir():
+        if not directory.is_dir():
+            continue
+        for path in directory.glob("*" + PROFILE_SUFFIX):
+            match = PROFILE_NAME.match(path.name)
+            if not match:
+                continue
+            profiles.append({
+                "endpoint": directory.name,
+                "name": path.name,
+                "taken_at": datetime.strptime(match.group(1), "%Y%m%dT%H%M%S"),
+                "elapsed_ms": int(match.group(2)),
+                "size": path.stat().st_size,
+            })
+    profiles.sort(key=lambda p: p["name"][:15], reverse=True)
+    return profiles
+
+
+def profile_path(endpoint, name):
+    """Path of a stored profile, or None if the names don't point at one (no path tricks)."""
+    if _endpoint_dir_name(endpoint) != endpoint or not PROFILE_NAME.match(name):
+        return None
+    root = profile_dir().resolve()
+    path = (root / endpoint / name).resolve()
+    # Belt and braces: whatever the names were, the file must sit in an endpoint directory under root
+    if path.parent.parent != root:
+        return None
+    return path if path.is_file() else None
+
+
+def profile_text(path, sort="cumulative", limit=40):
+    """pstats report of a stored profile: the top `limit` functions by `sort`."""
+    out = io.StringIO()
+    pstats.Stats(str(path), stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+# ------------------------
+# MIDDLEWARE
+# ------------------------
+
+# One profiler per thread at a time: a second one would take over the first's hook
+_thread = threading.local()
+
+
+def _start():
+    """(profiler, start time), or (None, None) if this thread is already being profiled."""
+    if getattr(_thread, "profiling", False):
+        return None, None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiling tool (a debugger, say) owns this thread
+        return None, None
+    _thread.profiling = True
+    return profiler, time.perf_counter()
+
+
+def _stop(profiler):
+    profiler.disable()
+    _thread.profiling = False
+
+
+class RequestProfilerMiddleware:
+    """
+    cProfiles requested or sampled requests (see the module docstring).
+
+    Goes after AuthenticationMiddleware: the header/parameter only counts for staff.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "PROFILER_SAMPLE_RATE", 0)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _requested(self, request):
+        return request.headers.get(PROFILE_HEADER) == "1" or request.GET.get(PROFILE_PARAM) == "1"
+
+    def _sampled(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        if not (self._sampled() or (self._requested(request) and request.user.is_staff)):
+            return self.get_response(request)
+
+        profiler, started = _start()
+        if profiler is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _stop(profiler)
+        return self._store(request, response, [profiler], started)
+
+    async def _acall(self, request):
+        if not self._sampled():
+            if not self._requested(request) or not (await request.auser()).is_staff:
+                return await self.get_response(request)
+
+        profiler, started = _start()
+        if profiler is None:
+            return await self.get_response(request)
+        # Sync views run on the request's thread-sensitive executor thread; profile that one too
+        thread_profiler, _ = await sync_to_async(_start)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _stop(profiler)
+            if thread_profiler is not None:
+                await sync_to_async(_stop)(thread_profiler)
+        profilers = [profiler] + ([thread_profiler] if thread_profiler else [])
+        return await sync_to_async(self._store)(request, response, profilers, started)
+
+    def _store(self, request, response, profilers, started):
+        match = request.resolver_match
+        view = match.view_name if match else "unresolved"
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        endpoint, name = save_profile(profilers, view, elapsed_ms, getattr(request, "request_id", None))
+        response["X-Profile-Id"] = f"{endpoint}/{name}"
+        return response
@@ -0,0 +1,87 @@
+"""
+Compact per-row bitmap encoding of a showtime's seat map.
+
+Next to the embedded `seats` array a showtime can carry:
+
+    "seat_rows":   [{"row": "A", "count": 15}, {"row": "B", "count": 15}, ...]
+    "seat_bitmap": {"A": Int64(0b100000110000), "B": Int64(0), ...}
+
+Bit n-1 of a row is set when seat <row><n> is not available (held or sold).
+Reservations keep the bits in step with `$bit` inside the same update that
+changes the seat, so reading the map never has to decode the seats array.
+
+This module has no Django or database imports so setup_database.py can use it too.
+"""
+
+import re
+
+from bson.int64 import Int64
+
+SEAT_LABEL = re.compile(r"^([A-Za-z]+)(\d+)$")
+
+# Int64 is signed, so keep clear of the sign bit
+MAX_SEATS_PER_ROW = 63
+
+
+def split_seat(label):
+    """'A12' -> ('A', 12). Returns None for labels that don't follow <row><number>."""
+    match = SEAT_LABEL.match(label)
+    if not match:
+        return None
+    row, number = match.group(1), int(match.group(2))
+    if not 1 <= number <= MAX_SEATS_PER_ROW:
+        return None
+    return row, number
+
+
+def row_masks(seat_labels):
+    """Group seat labels into one bit mask per row: ['A1', 'A3'] -> {'A': 0b101}."""
+    masks = {}
+    for label in seat_labels:
+        parsed = split_seat(label)
+        if parsed:
+            row, number = parsed
+            masks[row] = masks.get(row, 0) | (1 << (number - 1))
+    return masks
+
+
+def bit_update(seat_labels, taken):
+    """`$bit` operator setting (taken=True) or clearing (taken=False) these seats' bits."""
+    if taken:
+        return {f"seat_bitmap.{row}": {"or": Int64(mask)} for row, mask in row_masks(seat_labels).items()}
+    return {f"seat_bitmap.{row}": {"and": Int64(~mask)} for row, mask in row_masks(seat_labels).items()}
+
+
+def encode_seat_map(seats):
+    """
+    Build the `seat_rows` / `seat_bitmap` fields from a full seats array.
+
+    Returns None when a seat label can't be encoded, in which case the
+    showtime simply keeps using the plain seats array.
+    """
+    counts = {}
+    bitmap = {}
+    for seat in seats:
+        parsed = split_seat(seat["seat"])
+        if not parsed:
+            return None
+        row, number = parsed
+        counts[row] = max(counts.get(row, 0), number)
+        bitmap.setdefault(row, 0)
+        if seat["status"] != "available":
+            bitmap[row] |= 1 << (number - 1)
+
+    return {
+        "seat_rows": [{"row": row, "count": count} for row, count in counts.items()],
+        "seat_bitmap": {row: Int64(bits) for row, bits in bitmap.items()},
+    }
+
+
+def compact_payload(seat_rows, seat_bitmap):
+    """JSON body for the compact seat API: one hex string per row instead of one object per seat."""
+    return {
+        "rows": [
+            [r["row"], r["count"], format(int(seat_bitmap.get(r["row"], 0)), "x")]
+            for r in seat_rows
+        ]
+    }
@@ -0,0 +1,274 @@
+"""
+Seat-map helpers for Absolut Cinema.
+
+Every change to a showtime's embedded `seats` array goes through here so the
+views never have to load the whole seat map, edit it in Python and write it back.
+
+Seat lifecycle:
+    available -> held (reserve_seats, with a `hold_expires_at` lease)
+    held -> sold (confirm_seats, when the booking is paid)
+    held -> available (release_expired_holds, once the lease runs out)
+
+A held seat stays taken until the reaper releases it, which keeps the compact
+`seat_bitmap` (see seatmap.py) exactly in step with the seats array. Every web
+process runs the reaper on a background thread (start_hold_reaper, every
+settings.SEAT_HOLD_REAPER_SECONDS); set that to 0 when
+`python manage.py release_expired_holds --every N` runs on its own instead.
+
+Usage:
+    from booking.seats import reserve_seats
+    showtime = reserve_seats(showtime_oid, ["A1", "A2"], booking_id, hold_until)
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from pymongo import ReturnDocument, UpdateOne
+
+from .live import hub
+from .metrics import HOLD_EXPIRATIONS, RESERVATION_CONFLICTS
+from .mongo_db import db
+from .seatmap import bit_update
+
+logger = logging.getLogger(__name__)
+
+
+class SeatError(Exception):
+    """Raised when a reservation can't be applied. `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def hold_deadline(now=None):
+    """When a hold taken right now should lapse (settings.SEAT_HOLD_SECONDS, default 10 minutes)."""
+    now = now or datetime.now()
+    return now + timedelta(seconds=getattr(settings, "SEAT_HOLD_SECONDS", 600))
+
+
+def track_seat_change(update, seat_ids, taken):
+    """Add the seat_bitmap, seat_version and updated_at bookkeeping every seat update needs."""
+    bits = bit_update(seat_ids, taken)
+    if bits:
+        update["$bit"] = bits
+    update["$inc"] = {"seat_version": 1}
+    update["$currentDate"] = {"updated_at": True}
+    return update
+
+
+def seat_version(showtime_oid):
+    """
+    Current seat_version of a showtime, reading nothing else. None if it doesn't exist.
+
+    Every write to a showtime's seats bumps the counter, so it's a cheap
+    validator for anything derived from the seat map.
+    """
+    showtime = db.showtimes.find_one({"_id": showtime_oid}, {"seat_version": 1})
+    if not showtime:
+        return None
+    return showtime.get("seat_version", 0)
+
+
+def is_taken(seat):
+    """A seat is taken when it's held or sold."""
+    return seat["status"] != "available"
+
+
+def reserve_seats(showtime_oid, seat_ids, booking_id, hold_until):
+    """
+    Hold `seat_ids` for `booking_id` until `hold_until` in ONE server-side update.
+
+    The filter only matches when every requested seat is still available, so a
+    multi-seat request is all-or-nothing and two buyers can never both win the
+    same seat. Returns the showtime (without its seat map) on success and raises
+    SeatError otherwise.
+    """
+    seat_ids = list(dict.fromkeys(seat_ids))  # drop duplicates, keep order
+
+    showtime = db.showtimes.find_one_and_update(
+        {
+            "_id": showtime_oid,
+            "seats": {"$all": [
+                {"$elemMatch": {"seat": seat_num, "status": "available"}}
+                for seat_num in seat_ids
+            ]},
+        },
+        track_seat_change({
+            "$set": {
+                "seats.$[s].status": "held",
+                "seats.$[s].booking_id": booking_id,
+                "seats.$[s].hold_expires_at": hold_until,
+            },
+        }, seat_ids, taken=True),
+        array_filters=[{"s.seat": {"$in": seat_ids}}],
+        projection={"seats": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    if showtime:
+        hub.publish_change(showtime_oid, showtime)
+        return showtime
+
+    raise _explain_failure(showtime_oid, seat_ids)
+
+
+def confirm_seats(showtime_oid, seat_ids, booking_id):
+    """
+    Turn this booking's held seats into sold seats once it's paid.
+
+    Only succeeds while every seat is still held by `booking_id` under a live
+    lease, so a late payment can't claim seats that were released or resold.
+    """
+    seat_ids = list(seat_ids)
+    result = db.showtimes.update_one(
+        {
+            "_id": showtime_oid,
+            "seats": {"$all": [
+                {"$elemMatch": {
+                    "seat": seat_num,
+                    "status": "held",
+                    "booking_id": booking_id,
+                    "hold_expires_at": {"$gt": datetime.now()},
+                }}
+                for seat_num in seat_ids
+            ]},
+        },
+        {
+            "$set": {"seats.$[s].status": "sold"},
+            "$unset": {"seats.$[s].hold_expires_at": ""},
+            "$inc": {"seat_version": 1},
+            "$currentDate": {"updated_at": True},
+        },
+        array_filters=[{"s.seat": {"$in": seat_ids}, "s.booking_id": booking_id}],
+    )
+    if result.modified_count != 1:
+        return False
+    hub.publish_change(showtime_oid)
+    return True
+
+
+def release_seats(showtime_oid, seat_ids, booking_id):
+    """Put seats owned by `booking_id` back on sale (used to undo a half-finished reservation)."""
+    result = db.showtimes.update_one(
+        {"_id": showtime_oid, "seats.booking_id": booking_id},
+        track_seat_change({
+            "$set": {"seats.$[s].status": "available"},
+            "$unset": {"seats.$[s].booking_id": "", "seats.$[s].hold_expires_at": ""},
+        }, seat_ids, taken=False),
+        array_filters=[{"s.seat": {"$in": list(seat_ids)}, "s.booking_id": booking_id}],
+    )
+    if result.modified_count:
+        hub.publish_change(showtime_oid)
+    return result
+
+
+def release_expired_holds(now=None, batch_size=500):
+    """
+    Release every hold whose lease ran out and drop its unpaid booking.
+
+    Expired holds are found through the bookings collection
+    (`booking_confirmed=False, hold_expires_at <= now`), so this never scans
+    showtimes. Each batch costs one bulk_write on showtimes plus one delete on
+    bookings. Every booking gets its own UpdateOne guarded on it still holding
+    seats, so an overlapping reaper run can't clear bits a new buyer just set.
+    Returns how many bookings were released.
+    """
+    now = now or datetime.now()
+    released = 0
+
+    while True:
+        expired = list(db.bookings.find(
+            {"booking_confirmed": False, "hold_expires_at": {"$lte": now}},
+            {"showtime_id": 1, "seats": 1},
+        ).limit(batch_size))
+        if not expired:
+            return released
+
+        db.showtimes.bulk_write([
+            UpdateOne(
+                {
+                    "_id": booking["showtime_id"],
+                    "seats": {"$elemMatch": {"booking_id": booking["_id"], "status": "held"}},
+                },
+                track_seat_change({
+                    "$set": {"seats.$[s].status": "available"},
+                    "$unset": {"seats.$[s].booking_id": "", "seats.$[s].hold_expires_at": ""},
+                }, booking["seats"], taken=False),
+                array_filters=[{"s.status": "held", "s.booking_id": booking["_id"]}],
+            )
+            for booking in expired
+        ], ordered=False)
+
+        # booking_confirmed=False again here: a payment that landed meanwhile keeps its booking
+        result = db.bookings.delete_many({
+            "_id": {"$in": [b["_id"] for b in expired]},
+            "booking_confirmed": False,
+        })
+        released += result.deleted_count
+        HOLD_EXPIRATIONS.inc(result.deleted_count)
+
+        for showtime_oid in {booking["showtime_id"] for booking in expired}:
+            hub.publish_change(showtime_oid)
+
+        if len(expired) < batch_size:
+            return released
+
+
+_reaper = None
+_reaper_lock = threading.Lock()
+
+
+def start_hold_reaper(interval):
+    """
+    Run release_expired_holds every `interval` seconds on a daemon thread (once per process).
+
+    Several processes may each run one: every release is guarded on the
+    booking still holding its seats, so overlapping sweeps are harmless.
+    """
+    global _reaper
+    with _reaper_lock:
+        if _reaper and _reaper.is_alive():
+            return
+        _reaper = threading.Thread(target=_reap, args=(interval,), name="seat-hold-reaper", daemon=True)
+        _reaper.start()
+
+
+def _reap(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            released = release_expired_holds()
+            if released:
+                logger.info("Released expired holds", extra={"released": released})
+        except Exception:
+            # A database hiccup shouldn't kill the thread; the next sweep retries
+            logger.exception("Hold reaper sweep failed")
+
+
+def _explain_failure(showtime_oid, seat_ids):
+    # Only read back the seats we asked for, not the whole map
+    showtime = db.showtimes.find_one(
+        {"_id": showtime_oid},
+        {"seats": {"$filter": {
+            "input": "$seats",
+            "as": "s",
+            "cond": {"$in": ["$$s.seat", seat_ids]},
+        }}},
+    )
+    if not showtime:
+        return SeatError("Showtime not found", status=404)
+
+    seats_by_id = {s["seat"]: s for s in showtime.get("seats", [])}
+    for seat_num in seat_ids:
+        if seat_num not in seats_by_id:
+            return SeatError(f"Seat {seat_num} does not exist")
+        if is_taken(seats_by_id[seat_num]):
+            RESERVATION_CONFLICTS.inc(reason="taken")
+            return SeatError(f"Seat {seat_num} already taken")
+
+    # Everything looks free now: another buyer released a seat between our two reads
+    RESERVATION_CONFLICTS.inc(reason="changed")
+    return SeatError("Seats changed while reserving, please try again")
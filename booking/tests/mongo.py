@@ -0,0 +1,67 @@
+"""
+Base class for tests that need a real MongoDB.
+
+They run against MONGO_TEST_URI (default: a mongod on localhost) in a
+throwaway database, and are skipped when no server answers.
+
+    MONGO_TEST_URI=mongodb://localhost:27017 python manage.py test booking
+"""
+
+import os
+import unittest
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from booking import mongo_db
+
+TEST_URI = os.getenv("MONGO_TEST_URI", "mongodb://localhost:27017")
+TEST_DB_NAME = os.getenv("MONGO_TEST_DB_NAME", "absolut_cinema_test")
+
+
+def _mongo_available():
+    client = MongoClient(TEST_URI, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        client.close()
+
+
+class MongoTestCase(TestCase):
+    """Points booking.mongo_db (db, catalog_db, ...) at the test database and drops it afterwards."""
+
+    @classmethod
+    def setUpClass(cls):
+        if not _mongo_available():
+            raise unittest.SkipTest(f"No MongoDB at {TEST_URI}")
+        super().setUpClass()
+        options = dict(settings.MONGODB.get("OPTIONS", {}), w=1, serverSelectionTimeoutMS=2000)
+        cls._mongo_settings = override_settings(
+            MONGODB={"URI": TEST_URI, "NAME": TEST_DB_NAME, "OPTIONS": options},
+        )
+        cls._mongo_settings.enable()
+        cls._reset_client()
+        cls.db = mongo_db.get_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        mongo_db.get_client().drop_database(TEST_DB_NAME)
+        cls._reset_client()
+        cls._mongo_settings.disable()
+        super().tearDownClass()
+
+    @staticmethod
+    def _reset_client():
+        if mongo_db._client is not None:
+            mongo_db._client.close()
+        mongo_db._client = None
+        mongo_db._databases.clear()
+
+    def setUp(self):
+        for name in self.db.list_collection_names():
+            self.db.drop_collection(name)
@@ -0,0 +1,56 @@
+from datetime import datetime
+from unittest import TestCase
+
+from booking.analytics import DEFAULT_RANGE, MAX_SPANS, parse_range
+
+NOW = datetime(2025, 11, 10, 8, 30)
+
+
+class ParseRangeTests(TestCase):
+
+    def test_defaults(self):
+        self.assertEqual(parse_range({}, now=NOW), (NOW - DEFAULT_RANGE, NOW, "day", "UTC"))
+
+    def test_bare_to_date_includes_the_whole_day(self):
+        start, end, _, _ = parse_range({"from": "2025-11-01", "to": "2025-11-07"})
+        self.assertEqual((start, end), (datetime(2025, 11, 1), datetime(2025, 11, 8)))
+
+    def test_to_datetime_is_taken_as_is(self):
+        _, end, _, _ = parse_range({"from": "2025-11-01", "to": "2025-11-07T12:00"})
+        self.assertEqual(end, datetime(2025, 11, 7, 12))
+
+    def test_dates_are_converted_from_tz_to_naive_utc(self):
+        start, end, _, tz = parse_range({"from": "2025-11-01", "to": "2025-11-07", "tz": "Asia/Manila"})
+        self.assertEqual((start, end, tz), (datetime(2025, 10, 31, 16), datetime(2025, 11, 7, 16), "Asia/Manila"))
+
+    def test_explicit_offset_wins_over_tz(self):
+        start, _, _, _ = parse_range({"from": "2025-11-01T00:00+00:00", "to": "2025-11-02", "tz": "Asia/Manila"})
+        self.assertEqual(start, datetime(2025, 11, 1))
+
+    def test_from_must_be_before_to(self):
+        for params in ({"from": "2025-11-07", "to": "2025-11-06"}, {"from": "2025-11-07T00:00", "to": "2025-11-07T00:00"}):
+            with self.subTest(params=params), self.assertRaisesRegex(ValueError, "from must be before to"):
+                parse_range(params)
+
+    def test_unknown_time_zone(self):
+        for tz in ("Mars/Olympus", "../etc/passwd"):
+            with self.subTest(tz=tz), self.assertRaisesRegex(ValueError, "Unknown time zone"):
+                parse_range({"tz": tz}, now=NOW)
+
+    def test_bad_granularity(self):
+        with self.assertRaisesRegex(ValueError, "granularity must be one of"):
+            parse_range({"granularity": "minute"}, now=NOW)
+
+    def test_bad_date(self):
+        with self.assertRaisesRegex(ValueError, "from must be an ISO date"):
+            parse_range({"from": "last tuesday"}, now=NOW)
+
+    def test_span_is_capped_per_granularity(self):
+        end = datetime(2025, 11, 10)
+        for granularity, span in MAX_SPANS.items():
+            with self.subTest(granularity=granularity):
+                at_cap = {"from": (end - span).isoformat(), "to": end.isoformat(), "granularity": granularity}
+                self.assertEqual(parse_range(at_cap)[:2], (end - span, end))
+                too_long = dict(at_cap, **{"from": (end - span - DEFAULT_RANGE).isoformat()})
+                with self.assertRaisesRegex(ValueError, "can span at most"):
+                    parse_range(too_long)
@@ -0,0 +1,124 @@
+from datetime import datetime
+from unittest import TestCase
+
+from bson import ObjectId
+from bson.int64 import Int64
+
+from booking.consistency import _repair_operation, check_showtime, plan_repairs
+
+
+def showtime(**statuses):
+    return {"_id": ObjectId(), "seats": [{"seat": seat, "status": status} for seat, status in statuses.items()]}
+
+
+def booking(seats, confirmed=True):
+    return {"_id": ObjectId(), "seats": seats, "booking_confirmed": confirmed}
+
+
+class CheckShowtimeTests(TestCase):
+
+    def checks(self, st, bookings):
+        return {p["check"]: p["seats"] for p in check_showtime(st, bookings)}
+
+    def test_consistent_showtime(self):
+        st = showtime(A1="sold", A2="held", A3="available")
+        self.assertEqual(check_showtime(st, [booking(["A1"]), booking(["A2"], confirmed=False)]), [])
+
+    def test_sold_and_held_seats_without_booking(self):
+        st = showtime(A1="sold", A2="held", A3="available")
+        self.assertEqual(self.checks(st, []), {"sold_without_booking": ["A1"], "held_without_booking": ["A2"]})
+
+    def test_booked_not_sold(self):
+        st = showtime(A1="available", A2="held")
+        paid = booking(["A1", "A2"])
+        problems = check_showtime(st, [paid])
+        self.assertEqual(problems, [{
+            "check": "booked_not_sold",
+            "showtime_id": str(st["_id"]),
+            "seats": ["A1", "A2"],
+            "seat_status": {"A1": "available", "A2": "held"},
+            "booking_ids": {"A1": str(paid["_id"]), "A2": str(paid["_id"])},
+        }])
+
+    def test_pending_not_held(self):
+        st = showtime(A1="available")
+        self.assertEqual(self.checks(st, [booking(["A1"], confirmed=False)]), {"pending_not_held": ["A1"]})
+
+    def test_double_booked(self):
+        st = showtime(A1="sold", A2="sold")
+        problems = self.checks(st, [booking(["A1"]), booking(["A1", "A2"])])
+        self.assertEqual(problems, {"double_booked": ["A1"]})
+
+
+class PlanRepairsTests(TestCase):
+
+    def test_orphaned_seats_are_released(self):
+        st = showtime(A1="sold", A2="held")
+        plan = plan_repairs(check_showtime(st, []))
+        self.assertEqual(plan, [
+            {"action": "release", "showtime_id": str(st["_id"]), "seats": ["A1"], "from_status": "sold"},
+            {"action": "release", "showtime_id": str(st["_id"]), "seats": ["A2"], "from_status": "held"},
+        ])
+
+    def test_mark_sold_only_takes_available_seats(self):
+        st = showtime(A1="available", A2="held")
+        paid = booking(["A1", "A2"])
+        plan = plan_repairs(check_showtime(st, [paid]))
+        self.assertEqual(plan, [{
+            "action": "mark_sold",
+            "showtime_id": str(st["_id"]),
+            "seats": ["A1"],
+            "booking_ids": {"A1": str(paid["_id"])},
+        }])
+
+    def test_seats_held_by_someone_else_are_left_alone(self):
+        st = showtime(A1="held")
+        pending = booking(["A1"], confirmed=False)
+        self.assertEqual(plan_repairs(check_showtime(st, [pending, booking(["A1"])])), [])
+
+    def test_double_booked_and_pending_not_held_need_a_human(self):
+        st = showtime(A1="sold", A2="available")
+        problems = check_showtime(st, [booking(["A1"]), booking(["A1"]), booking(["A2"], confirmed=False)])
+        self.assertEqual({p["check"] for p in problems}, {"double_booked", "pending_not_held"})
+        self.assertEqual(plan_repairs(problems), [])
+
+
+class RepairOperationTests(TestCase):
+    cutoff = datetime(2026, 1, 1, 12, 0)
+
+    def test_release_is_guarded_on_status_and_age(self):
+        showtime_id = ObjectId()
+        op = _repair_operation(
+            {"action": "release", "showtime_id": str(showtime_id), "seats": ["A1", "A2"], "from_status": "held"},
+            self.cutoff,
+        )
+        self.assertEqual(op._filter, {
+            "_id": showtime_id,
+            "seats": {"$all": [
+                {"$elemMatch": {"seat": "A1", "status": "held"}},
+                {"$elemMatch": {"seat": "A2", "status": "held"}},
+            ]},
+            "$or": [{"updated_at": {"$lt": self.cutoff}}, {"updated_at": {"$exists": False}}],
+        })
+        self.assertEqual(op._doc["$set"], {"seats.$[s].status": "available"})
+        self.assertEqual(op._doc["$bit"], {"seat_bitmap.A": {"and": Int64(~0b11)}})
+        self.assertEqual(op._array_filters, [{"s.seat": {"$in": ["A1", "A2"]}}])
+
+    def test_mark_sold_sets_each_seats_booking(self):
+        showtime_id, first, second = ObjectId(), ObjectId(), ObjectId()
+        op = _repair_operation({
+            "action": "mark_sold",
+            "showtime_id": str(showtime_id),
+            "seats": ["A1", "B2"],
+            "booking_ids": {"A1": str(first), "B2": str(second)},
+        }, self.cutoff)
+        self.assertEqual(op._filter["seats"]["$all"][0], {"$elemMatch": {"seat": "A1", "status": "available"}})
+        self.assertIn({"updated_at": {"$lt": self.cutoff}}, op._filter["$or"])
+        self.assertEqual(op._doc["$set"], {
+            "seats.$[s0].status": "sold",
+            "seats.$[s0].booking_id": first,
+            "seats.$[s1].status": "sold",
+            "seats.$[s1].booking_id": second,
+        })
+        self.assertEqual(op._doc["$bit"], {"seat_bitmap.A": {"or": Int64(1)}, "seat_bitmap.B": {"or": Int64(0b10)}})
+        self.assertEqual(op._array_filters, [{"s0.seat": "A1"}, {"s1.seat": "B2"}])
@@ -0,0 +1,25 @@
+from unittest import TestCase
+
+from booking.loadtest import plan_requests, seat_rows
+
+
+class SeatRowsTests(TestCase):
+
+    def test_rows_follow_the_seat_labels(self):
+        labels = ["B2", "A10", "AA1", "A2", "B1", "A1"]
+        self.assertEqual(seat_rows(labels), [["A1", "A2", "A10"], ["B1", "B2"], ["AA1"]])
+
+    def test_unparsable_labels_share_a_row(self):
+        self.assertEqual(seat_rows(["Box 2", "A1", "Box"]), [["A1"], ["Box 2", "Box"]])
+
+
+class PlanRequestsTests(TestCase):
+
+    def test_groups_are_adjacent_seats_of_one_row(self):
+        labels = [f"{row}{n}" for row in "ABC" for n in range(1, 9)] + ["D1", "D2"]
+        rows = seat_rows(labels)
+        for group in plan_requests(labels, 200, seed=1, max_group=4):
+            row = next(r for r in rows if group[0] in r)
+            start = row.index(group[0])
+            self.assertEqual(group, row[start:start + len(group)])
+            self.assertLessEqual(len(group), 4)
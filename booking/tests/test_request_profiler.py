@@ -0,0 +1,41 @@
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+
+from booking.request_profiler import _endpoint_dir_name, profile_path
+
+NAME = "20261018T120000-42ms-3f2a9c.prof"
+
+
+class ProfilePathTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name) / "profiles"
+        (self.root / "movies").mkdir(parents=True)
+        (self.root / "movies" / NAME).write_bytes(b"")
+        # A file that looks like a profile, one level above the profile directory
+        (self.root.parent / NAME).write_bytes(b"")
+        settings = override_settings(PROFILER_DIR=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_stored_profile(self):
+        self.assertEqual(profile_path("movies", NAME), (self.root / "movies" / NAME).resolve())
+
+    def test_unknown_profile(self):
+        self.assertIsNone(profile_path("movies", "20261018T120000-1ms-abc.prof"))
+        self.assertIsNone(profile_path("payment", NAME))
+
+    def test_names_cant_leave_the_profile_directory(self):
+        for endpoint, name in [("..", NAME), (".", NAME), ("", NAME), ("movies/..", NAME), ("movies", "../" + NAME)]:
+            with self.subTest(endpoint=endpoint, name=name):
+                self.assertIsNone(profile_path(endpoint, name))
+
+    def test_dot_view_names_get_a_safe_directory(self):
+        for view in ("", ".", ".."):
+            with self.subTest(view=view):
+                self.assertEqual(_endpoint_dir_name(view), "_")
+        self.assertEqual(_endpoint_dir_name("booking.views.reserve_seat_api"), "booking.views.reserve_seat_api")
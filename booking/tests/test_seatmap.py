@@ -0,0 +1,74 @@
+from unittest import TestCase
+
+from bson.int64 import Int64
+
+from booking.seatmap import bit_update, compact_payload, encode_seat_map, split_seat
+
+
+class SplitSeatTests(TestCase):
+
+    def test_row_and_number(self):
+        self.assertEqual(split_seat("A1"), ("A", 1))
+        self.assertEqual(split_seat("AB12"), ("AB", 12))
+
+    def test_numbers_outside_a_row_are_rejected(self):
+        self.assertEqual(split_seat("A63"), ("A", 63))
+        self.assertIsNone(split_seat("A0"))
+        self.assertIsNone(split_seat("A64"))
+
+    def test_bad_labels(self):
+        for label in ("", "A", "12", "1A", "A-1", "A 1"):
+            with self.subTest(label=label):
+                self.assertIsNone(split_seat(label))
+
+
+class EncodeSeatMapTests(TestCase):
+
+    def test_held_and_sold_seats_set_their_bits(self):
+        seats = [
+            {"seat": "A1", "status": "sold"},
+            {"seat": "A2", "status": "available"},
+            {"seat": "A3", "status": "held"},
+            {"seat": "B1", "status": "available"},
+            {"seat": "B2", "status": "available"},
+        ]
+        self.assertEqual(encode_seat_map(seats), {
+            "seat_rows": [{"row": "A", "count": 3}, {"row": "B", "count": 2}],
+            "seat_bitmap": {"A": Int64(0b101), "B": Int64(0)},
+        })
+
+    def test_unencodable_label_returns_none(self):
+        seats = [{"seat": "A1", "status": "available"}, {"seat": "VIP", "status": "available"}]
+        self.assertIsNone(encode_seat_map(seats))
+        self.assertIsNone(encode_seat_map([{"seat": "A64", "status": "available"}]))
+
+
+class BitUpdateTests(TestCase):
+
+    def test_taking_seats_ors_in_their_bits(self):
+        self.assertEqual(bit_update(["A1", "A3", "B2"], taken=True), {
+            "seat_bitmap.A": {"or": Int64(0b101)},
+            "seat_bitmap.B": {"or": Int64(0b10)},
+        })
+
+    def test_freeing_seats_ands_out_their_bits(self):
+        update = bit_update(["A1", "A3"], taken=False)
+        self.assertEqual(update, {"seat_bitmap.A": {"and": Int64(~0b101)}})
+        self.assertEqual(0b1111 & update["seat_bitmap.A"]["and"], 0b1010)
+
+    def test_labels_that_cant_be_encoded_are_skipped(self):
+        self.assertEqual(bit_update(["VIP", "A0"], taken=True), {})
+
+
+class CompactPayloadTests(TestCase):
+
+    def test_one_hex_string_per_row(self):
+        seat_rows = [{"row": "A", "count": 15}, {"row": "B", "count": 15}, {"row": "C", "count": 10}]
+        seat_bitmap = {"A": Int64(0b100000110000), "B": Int64(0)}
+        self.assertEqual(compact_payload(seat_rows, seat_bitmap), {
+            "rows": [["A", 15, "830"], ["B", 15, "0"], ["C", 10, "0"]],
+        })
+
+    def test_highest_seat_fits(self):
+        payload = compact_payload([{"row": "A", "count": 63}], {"A": Int64(1 << 62)})
+        self.assertEqual(payload["rows"][0][2], "4" + "0" * 15)
@@ -0,0 +1,126 @@
+import json
+import threading
+
+from bson import ObjectId
+from django.test import SimpleTestCase
+
+from booking.seatmap import encode_seat_map
+from booking.seats import SeatError, hold_deadline, release_seats, reserve_seats
+from booking.views import MAX_SEATS_PER_BOOKING
+
+from .mongo import MongoTestCase
+
+
+def make_showtime(db, taken=()):
+    """A showtime with seats A1-A5, the ones in `taken` already sold."""
+    seats = [
+        {"seat": f"A{n}", "status": "sold" if f"A{n}" in taken else "available"}
+        for n in range(1, 6)
+    ]
+    showtime = {
+        "_id": ObjectId(),
+        "movie_id": ObjectId(),
+        "venue_id": ObjectId(),
+        "price": 300,
+        "seats": seats,
+        "seat_version": 0,
+        **encode_seat_map(seats),
+    }
+    db.showtimes.insert_one(showtime)
+    return showtime["_id"]
+
+
+class ReserveSeatsTests(MongoTestCase):
+
+    def test_one_taken_seat_fails_the_whole_request(self):
+        showtime_oid = make_showtime(self.db, taken={"A2"})
+        before = self.db.showtimes.find_one({"_id": showtime_oid})
+
+        with self.assertRaisesMessage(SeatError, "Seat A2 already taken"):
+            reserve_seats(showtime_oid, ["A1", "A2", "A3"], ObjectId(), hold_deadline())
+
+        self.assertEqual(self.db.showtimes.find_one({"_id": showtime_oid}), before)
+
+    def test_overlapping_reservations_have_one_winner(self):
+        for _ in range(10):
+            showtime_oid = make_showtime(self.db)
+            requests = {ObjectId(): ["A1", "A2"], ObjectId(): ["A2", "A3"]}
+            barrier = threading.Barrier(len(requests))
+            winners, losers = [], []
+
+            def reserve(booking_id, seat_ids):
+                barrier.wait()
+                try:
+                    reserve_seats(showtime_oid, seat_ids, booking_id, hold_deadline())
+                    winners.append(booking_id)
+                except SeatError:
+                    losers.append(booking_id)
+
+            threads = [threading.Thread(target=reserve, args=item) for item in requests.items()]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual((len(winners), len(losers)), (1, 1))
+            showtime = self.db.showtimes.find_one({"_id": showtime_oid})
+            held = {s["seat"]: s["booking_id"] for s in showtime["seats"] if s["status"] == "held"}
+            self.assertEqual(held, dict.fromkeys(requests[winners[0]], winners[0]))
+            self.assertEqual(showtime["seat_bitmap"], encode_seat_map(showtime["seats"])["seat_bitmap"])
+            self.assertEqual(showtime["seat_version"], 1)
+
+    def test_release_seats_only_frees_its_own_booking(self):
+        showtime_oid = make_showtime(self.db)
+        mine, theirs = ObjectId(), ObjectId()
+        reserve_seats(showtime_oid, ["A1"], mine, hold_deadline())
+        reserve_seats(showtime_oid, ["A2"], theirs, hold_deadline())
+
+        release_seats(showtime_oid, ["A1", "A2"], mine)
+
+        statuses = {s["seat"]: s["status"] for s in self.db.showtimes.find_one({"_id": showtime_oid})["seats"]}
+        self.assertEqual((statuses["A1"], statuses["A2"]), ("available", "held"))
+
+
+class ReserveSeatApiTests(MongoTestCase):
+
+    def test_failed_booking_insert_puts_the_seats_back(self):
+        showtime_oid = make_showtime(self.db)
+        before = self.db.showtimes.find_one({"_id": showtime_oid})
+        # A validator nothing passes, so the booking insert fails after the seats are held
+        self.db.create_collection("bookings", validator={"$jsonSchema": {"required": ["no_such_field"]}})
+
+        with self.assertLogs("booking.views", "ERROR"):
+            response = self.client.post(
+                "/api/reserve/",
+                json.dumps({"showtime_id": str(showtime_oid), "seat_ids": ["A1", "A2"]}),
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, 500)
+        after = self.db.showtimes.find_one({"_id": showtime_oid})
+        self.assertEqual(after["seats"], before["seats"])
+        self.assertEqual(after["seat_bitmap"], before["seat_bitmap"])
+        self.assertEqual(self.db.bookings.count_documents({}), 0)
+
+
+class ReserveSeatApiValidationTests(SimpleTestCase):
+    # Every case is rejected before MongoDB is touched
+
+    def post(self, body):
+        return self.client.post("/api/reserve/", json.dumps(body), content_type="application/json")
+
+    def test_seat_ids_must_be_a_list_of_labels(self):
+        showtime_id = str(ObjectId())
+        for seat_ids in ("A1", ["A1", 7], ["A1", None], ["A1", ""], {"A1": True}, ["A1", ["A2"]]):
+            with self.subTest(seat_ids=seat_ids):
+                response = self.post({"showtime_id": showtime_id, "seat_ids": seat_ids})
+                self.assertEqual(response.status_code, 400)
+
+    def test_too_many_seats(self):
+        seat_ids = [f"A{n}" for n in range(1, MAX_SEATS_PER_BOOKING + 2)]
+        response = self.post({"showtime_id": str(ObjectId()), "seat_ids": seat_ids})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bad_showtime_id_and_body(self):
+        self.assertEqual(self.post({"showtime_id": "nope", "seat_ids": ["A1"]}).status_code, 400)
+        self.assertEqual(self.post(["A1"]).status_code, 400)
@@ -1,26 +1,36 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 from django.shortcuts import render   # NEW import
 from django.shortcuts import render, redirect
 
+# Under an ASGI server the read-heavy pages run as async views (see async_views.py)
+pages = async_views if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
     path("", views.auth_page, name="auth_page"),
     path('admin-dashboard/', views.admin_dashboard_view, name='admin_dashboard'),
     path("dashboard/analytics-data/", views.analytics_data),
+    path("admin-dashboard/mongo-profile/", views.mongo_profile_view, name="mongo_profile"),
+    path("admin-dashboard/profiles/", views.profiles_view, name="profiles"),
+    path("admin-dashboard/profiles/<str:endpoint>/<str:name>", views.profile_download_view, name="profile_download"),
+    path("metrics", views.metrics_view, name="metrics"),
     path("login/", views.login_view, name="login"),
     path("signup/", views.signup_view, name="signup"),
 
-    path("movies/", views.movies_view, name="movies"),
+    path("movies/", pages.movies_view, name="movies"),
 
     # seat reservation page - changed to <str:showtime_id> for MongoDB ObjectIds
-    path("reserve/<str:showtime_id>/", views.reserve_view, name="reserve"),
+    path("reserve/<str:showtime_id>/", pages.reserve_view, name="reserve"),
 
     # APIs - also changed to <str:showtime_id> for MongoDB ObjectIds
-    path("api/seats/<str:showtime_id>/", views.seat_availability_api),
+    path("api/seats/<str:showtime_id>/", pages.seat_availability_api),
+    path("api/seats/<str:showtime_id>/compact/", views.seat_map_compact_api),
+    path("api/seats/<str:showtime_id>/events/", views.seat_events_stream),
     path("api/reserve/", views.reserve_seat_api),
 
     # other pages
     path("payment/", views.payment_view, name="payment"),
-    path("confirm/", views.confirm_view, name="confirm"),
+    path("confirm/", pages.confirm_view, name="confirm"),
 ]
\ No newline at end of file
@@ -2,90 +2,59 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 from django.utils.decorators import method_decorator
+import asyncio
 import json
-from datetime import datetime, timedelta
+import logging
+from datetime import datetime, timedelta, timezone
+from asgiref.sync import sync_to_async
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 import random
 import string
 
 # MongoDB connection - this is all we need!
-from .mongo_db import db
+from .mongo_db import catalog_db, causal_session, db
+from .analytics import RANGE_PARAMS, dashboard_data, parse_range, ranged_dashboard_data, record_payment
+from .caching import cache_key, cached, get_movie, get_venue
+from .profiler import summary as profiler_summary
+from .request_profiler import list_profiles, profile_path, profile_text
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, PAYMENT_CONFIRMATIONS, render as render_metrics
+from .live import SEAT_EVENT_FIELDS, format_sse, hub, seat_event
+from .seatmap import compact_payload, encode_seat_map
+from .seats import SeatError, confirm_seats, hold_deadline, is_taken, release_seats, reserve_seats, seat_version
+
+logger = logging.getLogger(__name__)
+
+# Most seats one reserve_seat_api request may hold
+MAX_SEATS_PER_BOOKING = 10
 
 # -- helper functions for ticket and masking -- gelo
 
 # for the admin dashboard
+@login_required
 def analytics_data(request):
-    from django.http import JsonResponse
-    from .mongo_db import db 
-
-    # MOVIE REVENUE
-    pipeline_movie = [
-        {"$group": {
-            "_id": "$movie_id",
-            "total_revenue": {"$sum": "$total_price"},
-            "tickets_sold": {"$sum": {"$size": "$seats"}}
-        }},
-        {"$lookup": {
-            "from": "movies",
-            "localField": "_id",
-            "foreignField": "_id",
-            "as": "movie"
-        }},
-        {"$unwind": "$movie"},
-        {"$project": {
-            "_id": "$movie.title",
-            "total_revenue": 1,
-            "tickets_sold": 1
-        }}
-    ]
-
-    movie_revenue = list(db.bookings.aggregate(pipeline_movie))
-
-    # VENUE REVENUE
-    pipeline_venue = [
-        {"$group": {
-            "_id": "$venue_id",
-            "total_revenue": {"$sum": "$total_price"},
-            "total_tickets": {"$sum": {"$size": "$seats"}}
-        }},
-        {"$lookup": {
-            "from": "venues",
-            "localField": "_id",
-            "foreignField": "_id",
-            "as": "venue"
-        }},
-        {"$unwind": "$venue"},
-        {"$project": {
-            "_id": "$venue.name",
-            "total_revenue": 1,
-            "total_tickets": 1,
-            "city": "$venue.city"
-        }}
-    ]
-
-    venue_revenue = list(db.bookings.aggregate(pipeline_venue))
-
-    # DAILY SALES
-    pipeline_daily = [
-        {"$group": {
-            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$payment.paid_at"}},
-            "daily_sales": {"$sum": "$total_price"},
-            "tickets_sold": {"$sum": {"$size": "$seats"}}
-        }},
-        {"$sort": {"_id": 1}}
-    ]
-
-    daily_sales = list(db.bookings.aggregate(pipeline_daily))
-
-    return JsonResponse({
-        "movieRevenue": movie_revenue,
-        "venueRevenue": venue_revenue,
-        "dailySales": daily_sales
-    }, safe=False)
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff only"}, status=403)
+    # All-time numbers are served from the rollups payment_view keeps up to date
+    # (see booking/analytics.py), not from aggregations over every booking
+    if not any(param in request.GET for param in RANGE_PARAMS):
+        return JsonResponse(dashboard_data(), safe=False)
+
+    # ?from=2025-11-01&to=2025-11-07&granularity=day&tz=Asia/Manila
+    try:
+        start, end, granularity, tz = parse_range(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse(ranged_dashboard_data(start, end, granularity, tz), safe=False)
 
 def generate_ticket_ref():
     """
@@ -155,45 +124,59 @@ def login_view(request):
 # MOVIES PAGE
 # ------------------------
 
+# The movie list changes a few times a year; new titles show up within a minute
+MOVIES_TIMEOUT = 60
+
+
 @login_required
 def movies_view(request):
-    # Fetch from MongoDB instead of SQL
-    movies = list(db.movies.find())
-    showtimes = list(db.showtimes.find())
+    # Fetch from MongoDB instead of SQL (listings may lag a little: read from secondaries)
+    movies = cached(cache_key("movies"), lambda: list(catalog_db.movies.find()), timeout=MOVIES_TIMEOUT)
+    # The page never renders seat maps, so leave the embedded arrays on the server
+    showtimes = list(catalog_db.showtimes.find({}, {"seats": 0}))
+    
+    # Batch the venue lookups into one $in query and join in memory,
+    # instead of two find_one calls per showtime
+    venues = list(catalog_db.venues.find({"_id": {"$in": showtime_venue_ids(showtimes)}}))
     
+    return render(request, "booking/movies.html", movies_context(movies, showtimes, venues))
+
+
+def showtime_venue_ids(showtimes):
+    return list({st["venue_id"] for st in showtimes if st.get("venue_id")})
+
+
+def movies_context(movies, showtimes, venues):
+    """Template context of the movies page (shared with async_views.movies_view)."""
     # Convert movie ObjectIds to strings for consistency
     for movie in movies:
         movie["id"] = str(movie["_id"])  # Add 'id' key for template compatibility
     
+    movies_by_id = {movie["_id"]: movie for movie in movies}
+    venues_by_id = {}
+    for venue in venues:
+        venue["id"] = str(venue["_id"])
+        venues_by_id[venue["_id"]] = venue
+    
     # Enrich showtimes with movie and venue details, convert ObjectId to string for URLs
     enriched_showtimes = []
     for st in showtimes:
-        movie = db.movies.find_one({"_id": st["movie_id"]})
-        venue = db.venues.find_one({"_id": st["venue_id"]})
-        
-        # Ensure movie and venue have 'id' fields too
-        if movie:
-            movie["id"] = str(movie["_id"])
-        if venue:
-            venue["id"] = str(venue["_id"])
-        
         enriched_showtimes.append({
             "_id": str(st["_id"]),  # Convert ObjectId to string for URL
             "id": str(st["_id"]),   # Also add 'id' key for template compatibility
             "movie_id": str(st["movie_id"]),
             "venue_id": str(st["venue_id"]),
-            "movie": movie,
-            "venue": venue,
+            "movie": movies_by_id.get(st["movie_id"]),
+            "venue": venues_by_id.get(st["venue_id"]),
             "screen_name": st.get("screen_name"),
             "schedule": st.get("schedule"),
             "price": st.get("price"),
-            "seats": st.get("seats", [])
         })
     
-    return render(request, "booking/movies.html", {
+    return {
         "movies": movies,
         "showtimes": enriched_showtimes
-    })
+    }
 
 
 # ------------------------
@@ -211,32 +194,53 @@ def reserve_view(request, showtime_id):
             return redirect("movies")
         
         # Get the associated movie and venue
-        movie = db.movies.find_one({"_id": showtime["movie_id"]})
-        venue = db.venues.find_one({"_id": showtime["venue_id"]})
+        movie = get_movie(showtime["movie_id"])
+        venue = get_venue(showtime["venue_id"])
         
-        # Format showtime data for template
-        showtime_display = {
-            "date": showtime["schedule"].strftime("%B %d, %Y") if showtime.get("schedule") else "N/A",
-            "time": showtime["schedule"].strftime("%I:%M %p") if showtime.get("schedule") else "N/A",
-            "venue": venue["name"] if venue else "N/A",
-            "price": showtime.get("price", 0),
-            "screen_name": showtime.get("screen_name", "Screen")
-        }
-        
-        return render(request, "booking/reserve.html", {
-            "showtime": showtime_display,
-            "showtime_id": showtime_id,
-            "movie": movie,
-            "venue": venue,
-        })
+        return render(request, "booking/reserve.html", reserve_context(showtime_id, showtime, movie, venue))
     except:
         # Invalid ObjectId format
         return redirect("movies")
 
+
+def reserve_context(showtime_id, showtime, movie, venue):
+    """Template context of the reserve page (shared with async_views.reserve_view)."""
+    # Format showtime data for template
+    showtime_display = {
+        "date": showtime["schedule"].strftime("%B %d, %Y") if showtime.get("schedule") else "N/A",
+        "time": showtime["schedule"].strftime("%I:%M %p") if showtime.get("schedule") else "N/A",
+        "venue": venue["name"] if venue else "N/A",
+        "price": showtime.get("price", 0),
+        "screen_name": showtime.get("screen_name", "Screen")
+    }
+    return {
+        "showtime": showtime_display,
+        "showtime_id": showtime_id,
+        "movie": movie,
+        "venue": venue,
+        "live_seats": settings.LIVE_SEATS,
+    }
+
 # ------------------------
 # APIs
 # ------------------------
 
+def _seat_etag(suffix):
+    # ETag for the seat APIs, built from the showtime's seat_version counter
+    def etag(request, showtime_id):
+        try:
+            version = seat_version(ObjectId(showtime_id))
+        except Exception:
+            return None  # let the view answer 400
+        if version is None:
+            return None
+        return f"{showtime_id}-{version}-{suffix}"
+    return etag
+
+
+# Clients always revalidate; an unchanged seat map costs one tiny read and a 304
+@cache_control(no_cache=True)
+@condition(etag_func=_seat_etag("full"))
 def seat_availability_api(request, showtime_id):
     try:
         # Convert string showtime_id to ObjectId for MongoDB query
@@ -246,85 +250,138 @@ def seat_availability_api(request, showtime_id):
         if not showtime:
             return JsonResponse({"error": "Showtime not found"}, status=404)
         
-        # Get seats from showtime document
-        seats = showtime.get("seats", [])
-        data = [
-            {"seat": s["seat"], "is_taken": s["status"] == "sold"}
-            for s in seats
-        ]
-        return JsonResponse(data, safe=False)
+        return JsonResponse(seat_availability(showtime), safe=False)
     except:
         return JsonResponse({"error": "Invalid showtime ID"}, status=400)
 
 
+def seat_availability(showtime):
+    # Get seats from showtime document (held seats count as taken)
+    seats = showtime.get("seats", [])
+    return [
+        {"seat": s["seat"], "is_taken": is_taken(s)}
+        for s in seats
+    ]
+
+
+@cache_control(no_cache=True)
+@condition(etag_func=_seat_etag("compact"))
+def seat_map_compact_api(request, showtime_id):
+    """
+    Compact variant of seat_availability_api: one hex bitmask per row.
+
+    Reads only the `seat_rows` / `seat_bitmap` fields, so the seats array is
+    never sent over the wire or decoded. Showtimes that were never encoded
+    fall back to building the bitmap from their seats array.
+    """
+    try:
+        showtime_oid = ObjectId(showtime_id)
+    except Exception:
+        return JsonResponse({"error": "Invalid showtime ID"}, status=400)
+
+    showtime = db.showtimes.find_one({"_id": showtime_oid}, {"seat_rows": 1, "seat_bitmap": 1})
+    if not showtime:
+        return JsonResponse({"error": "Showtime not found"}, status=404)
+
+    if "seat_rows" not in showtime:
+        showtime = db.showtimes.find_one({"_id": showtime_oid}, {"seats.seat": 1, "seats.status": 1})
+        encoded = encode_seat_map(showtime.get("seats", []))
+        if not encoded:
+            return JsonResponse({"error": "Seat map can't be encoded"}, status=409)
+        showtime.update(encoded)
+
+    return JsonResponse(compact_payload(showtime["seat_rows"], showtime["seat_bitmap"]))
+
+
+async def seat_events_stream(request, showtime_id):
+    """
+    Server-Sent Events stream of a showtime's seat map (serve through asgi.py,
+    with settings.LIVE_SEATS on).
+
+    Sends the current compact map straight away, then one event per seat change
+    from the shared per-process hub, plus a keep-alive comment every 15 seconds.
+    """
+    # Under WSGI the endless stream would pin a worker thread per open page.
+    # 204 tells EventSource to stop reconnecting.
+    if not settings.LIVE_SEATS or not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    try:
+        showtime_oid = ObjectId(showtime_id)
+    except Exception:
+        return JsonResponse({"error": "Invalid showtime ID"}, status=400)
+
+    if await sync_to_async(seat_version)(showtime_oid) is None:
+        return JsonResponse({"error": "Showtime not found"}, status=404)
+
+    async def stream():
+        # Subscribe before reading the snapshot, so a change landing in between is still pushed
+        queue = hub.subscribe(showtime_id)
+        try:
+            showtime = await sync_to_async(db.showtimes.find_one)({"_id": showtime_oid}, SEAT_EVENT_FIELDS) or {}
+            sent = showtime.get("seat_version", 0)
+            yield format_sse(seat_event(showtime))
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                # Skip events the snapshot (or a later event) already covered
+                if event["seat_version"] <= sent:
+                    continue
+                sent = event["seat_version"]
+                yield format_sse(event)
+        finally:
+            hub.unsubscribe(showtime_id, queue)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+    return response
+
+
 @csrf_exempt
 def reserve_seat_api(request):
     if request.method == "POST":
-        print("\n" + "="*60)
-        print("RESERVE_SEAT_API CALLED")
-        print("="*60)
-        
         try:
             body = json.loads(request.body)
+            if not isinstance(body, dict):
+                return JsonResponse({"error": "Expected a JSON object"}, status=400)
             showtime_id = body.get("showtime_id")
             seat_ids = body.get("seat_ids", [])
             user_id = request.user.id
-            
-                         
-            print(f"DEBUG reserve_seat_api: Received request")
-            print(f"  showtime_id={showtime_id} (type: {type(showtime_id)})")
-            print(f"  seat_ids={seat_ids}")
-            print(f"  user_id={user_id} (type: {type(user_id)})")
+            logger.debug("Reserve request", extra={"showtime_id": showtime_id, "seats": seat_ids, "user_id": user_id})
             
             if not showtime_id or not seat_ids:
-                print("DEBUG: Missing showtime_id or seat_ids")
+                logger.debug("Reserve request missing showtime_id or seat_ids")
                 return JsonResponse({"error": "Missing data"}, status=400)
+
+            # A bare string would be split into characters, other items break the seat helpers
+            if not isinstance(seat_ids, list) or not all(isinstance(seat, str) and seat for seat in seat_ids):
+                return JsonResponse({"error": "seat_ids must be a list of seat labels"}, status=400)
+            if len(seat_ids) > MAX_SEATS_PER_BOOKING:
+                return JsonResponse({"error": f"At most {MAX_SEATS_PER_BOOKING} seats per booking"}, status=400)
             
             # Convert string showtime_id to ObjectId
-            showtime_oid = ObjectId(showtime_id)
-            showtime = db.showtimes.find_one({"_id": showtime_oid})
+            try:
+                showtime_oid = ObjectId(showtime_id)
+            except Exception:
+                return JsonResponse({"error": "Invalid showtime ID"}, status=400)
             
-            if not showtime:
-                print("DEBUG: Showtime not found")
-                return JsonResponse({"error": "Showtime not found"}, status=404)
-            
-            print(f"DEBUG: Found showtime with {len(showtime.get('seats', []))} seats")
-            
-            # Check if seats are available and mark them as sold
-            reserved = []
-            for seat_num in seat_ids:
-                print(f"DEBUG: Checking seat {seat_num}")
-                seat_found = False
-                for seat in showtime["seats"]:
-                    if seat["seat"] == seat_num:
-                        seat_found = True
-                        print(f"DEBUG: Found seat {seat_num}, status: {seat['status']}")
-                        if seat["status"] == "available":
-                            seat["status"] = "sold"
-                            seat["booking_id"] = ObjectId()  # Temporary booking ID
-                            reserved.append(seat_num)
-                            print(f"DEBUG: Marked seat {seat_num} as sold")
-                        else:
-                            print(f"DEBUG: Seat {seat_num} already taken")
-                            return JsonResponse({"error": f"Seat {seat_num} already taken"}, status=400)
-                        break
-                
-                if not seat_found:
-                    print(f"DEBUG: Seat {seat_num} does not exist")
-                    return JsonResponse({"error": f"Seat {seat_num} does not exist"}, status=400)
+            # Hold the seats in one atomic update (all or nothing) until the user pays
+            booking_id = ObjectId()
+            hold_until = hold_deadline()
+            try:
+                showtime = reserve_seats(showtime_oid, seat_ids, booking_id, hold_until)
+            except SeatError as e:
+                logger.info("Reservation rejected: %s", e, extra={"showtime_id": showtime_id, "seats": seat_ids})
+                return JsonResponse({"error": str(e)}, status=e.status)
             
-            # Update the showtime document in MongoDB
-            db.showtimes.update_one(
-                {"_id": showtime_oid},
-                {"$set": {"seats": showtime["seats"]}}
-            )
+            reserved = list(dict.fromkeys(seat_ids))
+            logger.debug("Seats held", extra={"showtime_id": showtime_id, "seats": reserved, "hold_until": hold_until})
             
             # Create a booking record in MongoDB bookings collection
-            if not reserved:
-                print("DEBUG: No seats were reserved!")
-                return JsonResponse({"error": "No seats were reserved"}, status=400)
-            
-            booking_id = ObjectId()
             booking_data = {
                 "_id": booking_id,
                 "user_id": user_id,
@@ -334,98 +391,70 @@ def reserve_seat_api(request):
                 "seats": reserved,
                 "total_price": len(reserved) * showtime["price"],
                 "booking_confirmed": False,
+                "hold_expires_at": hold_until,
+                "updated_at": datetime.now(timezone.utc),
                 "payment": {},
                 "ticket": {}
             }
-            print(f"DEBUG reserve_seat_api: Creating booking with:")
-            print(f"  _id={booking_id}")
-            print(f"  user_id={user_id} (type: {type(user_id)})")
-            print(f"  showtime_id={showtime_oid} (type: {type(showtime_oid)})")
-            print(f"  seats={reserved}")
-            print(f"  booking_confirmed=False")
-            
-            db.bookings.insert_one(booking_data)
-            print(f"DEBUG: Booking created successfully with ID {booking_id}")
-            
-            # Verify it was created
-            created_booking = db.bookings.find_one({"_id": booking_id})
-            print(f"DEBUG: Verified booking exists in DB: {created_booking is not None}")
-            
-            print(f"DEBUG: Returning success with reserved seats: {reserved}")
-            return JsonResponse({"message": "Seats reserved", "reserved": reserved})
+            try:
+                # Causal session: the payment page is guaranteed to read this insert back
+                with causal_session(request) as session:
+                    db.bookings.insert_one(booking_data, session=session)
+            except Exception:
+                # Don't leave seats sold to a booking that was never written
+                release_seats(showtime_oid, reserved, booking_id)
+                raise
+            logger.debug("Booking created", extra={"booking_id": booking_id, "showtime_id": showtime_id, "seats": reserved})
+            return JsonResponse({
+                "message": "Seats reserved",
+                "reserved": reserved,
+                "booking_id": str(booking_id),
+            })
         
         except json.JSONDecodeError as e:
-            print(f"DEBUG: JSON decode error: {e}")
+            logger.debug("Reserve request with invalid JSON: %s", e)
             return JsonResponse({"error": "Invalid JSON"}, status=400)
         except Exception as e:
-            print(f"DEBUG: Exception in reserve_seat_api: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Reservation failed")
             return JsonResponse({"error": str(e)}, status=500)
 
 # Payment page (Ayesha) -- gelo edits here for payment stuff backend 3
 @login_required
 def payment_view(request):
-    print("\n" + "="*60)
-    print("PAYMENT_VIEW CALLED")
-    print("="*60)
-    
-    # 1. Which showtime is the user paying for?
+    # 1. Which showtime and booking is the user paying for? (reserve_seat_api hands us both)
     showtime_id = request.GET.get("showtime_id")
-    print(f"DEBUG payment_view: showtime_id={showtime_id}, user_id={request.user.id}")
+    booking_id = request.GET.get("booking_id")
+    logger.debug("Payment page", extra={"showtime_id": showtime_id, "booking_id": booking_id, "user_id": request.user.id})
     
     try:
-        if not showtime_id:
-            print("DEBUG: No showtime_id provided")
+        if not showtime_id or not booking_id:
+            logger.debug("Payment page without showtime_id or booking_id")
             return redirect("movies")
             
         showtime_oid = ObjectId(showtime_id)
-        showtime = db.showtimes.find_one({"_id": showtime_oid})
+        showtime = db.showtimes.find_one({"_id": showtime_oid}, {"seats": 0})
         
         if not showtime:
-            print("DEBUG: Showtime not found in DB")
+            logger.debug("Payment for unknown showtime", extra={"showtime_id": showtime_id})
             return redirect("movies")
         
-        # 2. Get the booking for this user & showtime
-        # Try multiple times in case of timing issues
-        booking = None
-        for attempt in range(3):
+        # 2. Get the booking by _id in the same causal session the reservation wrote it in,
+        # so it's there on the first read - no retries needed
+        with causal_session(request) as session:
             booking = db.bookings.find_one({
+                "_id": ObjectId(booking_id),
                 "user_id": request.user.id,
                 "showtime_id": showtime_oid,
                 "booking_confirmed": False
-            })
-            if booking:
-                break
-            if attempt < 2:
-                print(f"DEBUG: Booking not found on attempt {attempt + 1}, retrying...")
-                import time
-                time.sleep(0.5)
-        
-        print(f"DEBUG payment_view: Looking for booking with:")
-        print(f"  user_id={request.user.id} (type: {type(request.user.id)})")
-        print(f"  showtime_id={showtime_oid} (type: {type(showtime_oid)})")
-        print(f"  booking_confirmed=False")
-        print(f"DEBUG: Found booking after {(3 if not booking else 1)} attempt(s): {booking is not None}")
+            }, session=session)
         
         if not booking:
-            print("DEBUG: No booking found - checking all bookings for this user")
-            all_bookings = list(db.bookings.find({"user_id": request.user.id}))
-            print(f"DEBUG: Total bookings for user {request.user.id}: {len(all_bookings)}")
-            for b in all_bookings:
-                print(f"DEBUG: Booking {b['_id']}: user_id={b.get('user_id')} (type: {type(b.get('user_id'))}), showtime_id={b.get('showtime_id')} (type: {type(b.get('showtime_id'))}), confirmed={b.get('booking_confirmed')}")
-            
-            print("DEBUG: Checking if any bookings match without confirmed filter:")
-            all_bookings_any = list(db.bookings.find({"user_id": request.user.id, "showtime_id": showtime_oid}))
-            print(f"DEBUG: Found {len(all_bookings_any)} bookings with matching user and showtime")
-            for b in all_bookings_any:
-                print(f"DEBUG: Booking: {b}")
-            
+            logger.debug("No pending booking to pay", extra={"showtime_id": showtime_id, "booking_id": booking_id})
             return redirect("movies")
         
         # 3. Get movie and venue info
-        movie = db.movies.find_one({"_id": showtime["movie_id"]})
-        venue = db.venues.find_one({"_id": showtime["venue_id"]})
+        movie = get_movie(showtime["movie_id"])
+        venue = get_venue(showtime["venue_id"])
         
         total_amount = booking["total_price"]
         
@@ -434,34 +463,59 @@ def payment_view(request):
             method = request.POST["payment_method"]      # "gcash" or "card"
             account_num = request.POST["account_number"]  # user input
 
-            # 5. "Process" payment: generate ticket + mask account
-            ticket_ref = generate_ticket_ref()
+            # 5. "Process" payment: mask account (ticket ref is generated in step 7)
             masked = mask_account_number(method, account_num)
 
-            # 6. Update booking with payment info
-            db.bookings.update_one(
-                {"_id": booking["_id"]},
-                {"$set": {
-                    "booking_confirmed": True,
-                    "payment": {
-                        "payment_method": method,
-                        "masked_account": masked,
-                        "paid_at": datetime.now()
-                    },
-                    "ticket": {
-                        "ticket_ref": ticket_ref,
-                        "issued": datetime.now(),
-                        "status": "active"
-                    }
-                }}
-            )
-
-            # 7. Store minimal info in session for confirm page
+            # 6. Turn the held seats into sold seats - fails if the hold already ran out
+            if not confirm_seats(showtime_oid, booking["seats"], booking["_id"]):
+                logger.info("Seat hold expired before payment", extra={"booking_id": booking["_id"]})
+                PAYMENT_CONFIRMATIONS.inc(outcome="hold_expired")
+                return redirect("reserve", showtime_id=showtime_id)
+
+            # 7. Update booking with payment info
+            # UTC, like updated_at; rollup_daily and the ranged dashboard count days in UTC
+            paid_at = datetime.now(timezone.utc)
+            # ticket refs are unique (see booking/indexes.py), so draw again on the rare clash
+            for attempt in range(5):
+                ticket_ref = generate_ticket_ref()
+                try:
+                    result = db.bookings.update_one(
+                        {"_id": booking["_id"], "booking_confirmed": False},
+                        {"$unset": {"hold_expires_at": ""}, "$currentDate": {"updated_at": True}, "$set": {
+                            "booking_confirmed": True,
+                            "payment": {
+                                "payment_method": method,
+                                "masked_account": masked,
+                                "paid_at": paid_at
+                            },
+                            "ticket": {
+                                "ticket_ref": ticket_ref,
+                                "issued": paid_at,
+                                "status": "active"
+                            }
+                        }}
+                    )
+                    break
+                except DuplicateKeyError:
+                    if attempt == 4:
+                        raise
+            if result.matched_count == 0:
+                # The hold reaper dropped this booking while we were confirming seats
+                logger.info("Booking expired while paying, releasing seats", extra={"booking_id": booking["_id"]})
+                PAYMENT_CONFIRMATIONS.inc(outcome="hold_expired")
+                release_seats(showtime_oid, booking["seats"], booking["_id"])
+                return redirect("reserve", showtime_id=showtime_id)
+
+            # Count the sale in the dashboard rollups
+            record_payment(booking, movie, venue, paid_at)
+            PAYMENT_CONFIRMATIONS.inc(outcome="confirmed")
+
+            # 8. Store minimal info in session for confirm page
             request.session["last_ticket_ref"] = ticket_ref
             request.session["last_showtime_id"] = showtime_id
             request.session["last_booking_id"] = str(booking["_id"])
 
-            # 8. Redirect to e-ticket page
+            # 9. Redirect to e-ticket page
             return redirect("confirm")
 
         # GET request → just show the payment form
@@ -473,10 +527,8 @@ def payment_view(request):
             "total_amount": total_amount,
         })
     
-    except Exception as e:
-        print(f"DEBUG: Exception in payment_view: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Payment failed")
         return redirect("movies")
 
 @login_required
@@ -501,26 +553,75 @@ def confirm_view(request):
         
         # Get showtime, movie, and venue
         showtime = db.showtimes.find_one({"_id": showtime_oid})
-        movie = db.movies.find_one({"_id": showtime["movie_id"]})
-        venue = db.venues.find_one({"_id": showtime["venue_id"]})
+        movie = get_movie(showtime["movie_id"])
+        venue = get_venue(showtime["venue_id"])
         
         if not showtime or not movie or not venue:
             return redirect("movies")
         
-        return render(request, "booking/confirm.html", {
-            "ticket_ref": ticket_ref,
-            "showtime": showtime,
-            "booking": booking,
-            "movie": movie,
-            "venue": venue,
-            "payment_method": booking["payment"].get("payment_method", "N/A"),
-            "masked_account": booking["payment"].get("masked_account", "N/A"),
-        })
+        return render(request, "booking/confirm.html", confirm_context(ticket_ref, showtime, booking, movie, venue))
     
     except Exception as e:
         return redirect("movies")
 
+
+def confirm_context(ticket_ref, showtime, booking, movie, venue):
+    """Template context of the e-ticket page (shared with async_views.confirm_view)."""
+    return {
+        "ticket_ref": ticket_ref,
+        "showtime": showtime,
+        "booking": booking,
+        "movie": movie,
+        "venue": venue,
+        "payment_method": booking["payment"].get("payment_method", "N/A"),
+        "masked_account": booking["payment"].get("masked_account", "N/A"),
+    }
+
 # Admin dashboard / analytics (Ronnel)
 @login_required
 def admin_dashboard_view(request):
-    return render(request, "booking/admin_dashboard.html")
\ No newline at end of file
+    if not request.user.is_staff:
+        return redirect("movies")
+    return render(request, "booking/admin_dashboard.html")
+
+
+# Rolling per-view summary of MongoDB commands (booking/profiler.py), staff only
+@login_required
+def mongo_profile_view(request):
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff only"}, status=403)
+    return JsonResponse(profiler_summary())
+
+
+# Stored cProfile runs of live requests (booking/request_profiler.py), staff only
+@login_required
+def profiles_view(request):
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff only"}, status=403)
+    endpoint = request.GET.get("endpoint")
+    profiles = [p for p in list_profiles() if not endpoint or p["endpoint"] == endpoint]
+    return render(request, "booking/profiles.html", {"profiles": profiles, "endpoint": endpoint})
+
+
+PROFILE_SORTS = ("cumulative", "tottime", "calls")
+
+
+@login_required
+def profile_download_view(request, endpoint, name):
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff only"}, status=403)
+    path = profile_path(endpoint, name)
+    if path is None:
+        raise Http404("No such profile")
+    if request.GET.get("format") == "text":
+        sort = request.GET.get("sort") if request.GET.get("sort") in PROFILE_SORTS else "cumulative"
+        return HttpResponse(profile_text(path, sort=sort), content_type="text/plain; charset=utf-8")
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=f"{endpoint}-{name}")
+
+
+# Prometheus scrape target (booking/metrics.py). Bearer token when settings.METRICS_TOKEN is set.
+def metrics_view(request):
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if token and not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse("Unauthorized", status=401, content_type="text/plain")
+    return HttpResponse(render_metrics(), content_type=METRICS_CONTENT_TYPE)
@@ -1,27 +1,17 @@
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
-from dotenv import load_dotenv
 import os
 
-load_dotenv()
-uri = os.getenv("MONGODB_URI")
+# Same client and database as the app (booking/mongo_db.py, settings.MONGODB)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'absolut_cinema.settings')
 
-# Create client
-client = MongoClient(uri, server_api=ServerApi('1'))
+from booking.mongo_db import db, test_mongo_connection
 
-# Access database
-db = client.absolutcinema
-
-# Export collections
+# Export collections (no round trip to the server on import)
 venues = db.venues
 movies = db.movies
 users = db.users
 showtimes = db.showtimes
 bookings = db.bookings
 
-# Test connection
-try:
-    client.admin.command('ping')
-    print("✓ Connected to MongoDB Atlas")
-except Exception as e:
-    print(f"✗ Error: {e}")
\ No newline at end of file
+# Test connection: python database.py
+if __name__ == '__main__':
+    test_mongo_connection()
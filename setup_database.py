@@ -1,19 +1,16 @@
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
-from dotenv import load_dotenv
 from datetime import datetime
 from bson import ObjectId
 import os
 
-# Load environment variables
-load_dotenv()
-uri = os.getenv("MONGODB_URI")
+# Connection settings (URI, database name, pool...) come from settings.MONGODB
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'absolut_cinema.settings')
 
-# Create client
-client = MongoClient(uri, server_api=ServerApi('1'))
+from booking.mongo_db import get_client, get_db
+from booking.seatmap import encode_seat_map
 
-# Create/access database
-db = client.absolutcinema
+# Create/access database (the same one the app reads)
+client = get_client()
+db = get_db()
 
 print("🎬 Setting up Absolut Cinema database...\n")
 
@@ -314,6 +311,12 @@ showtimes_data = [
 
 ]
 
+# Compact per-row bitmap of taken seats, served by /api/seats/<id>/compact/,
+# and the counter every seat change bumps (the seat APIs' ETag)
+for showtime in showtimes_data:
+    showtime.update(encode_seat_map(showtime["seats"]))
+    showtime["seat_version"] = 0
+
 showtimes_collection.delete_many({})
 showtimes_collection.insert_many(showtimes_data)
 print(f"✓ Inserted {len(showtimes_data)} showtimes\n")
@@ -512,7 +515,7 @@ print(f"✓ Inserted {len(bookings_data)} bookings\n")
 print("=" * 50)
 print("✅ Database setup complete!")
 print("=" * 50)
-print(f"\nDatabase: absolutcinema")
+print(f"\nDatabase: {db.name}")
 print(f"\nCollections created:")
 print(f"  • venues      - {db.venues.count_documents({})} documents")
 print(f"  • movies      - {db.movies.count_documents({})} documents")
@@ -526,5 +529,8 @@ print(f"  User (Juan): 654321abcdef123456789013")
 print(f"  Booking: 654321abcdef123456789014")
 print(f"  Venue (Katipunan): 612345abcdef678901234567")
 
+print(f"\n📊 Run `python manage.py rebuild_rollups` so the admin dashboard counts these bookings.")
+print(f"📈 Need load-test sized data? `python manage.py generate_data --help`")
+
 client.close()
 print("\n🎉 Ready to start booking tickets!")
\ No newline at end of file